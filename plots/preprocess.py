@@ -32,6 +32,14 @@ class InstanceData(TypedDict):
     n: int
 
 
+class TimedScopeData(TypedDict, total=False):
+    calls: int
+    cumulative_s: float
+    self_s: float
+    samples: int
+    children: dict[str, "TimedScopeData"]
+
+
 class BenchmarkResult(TypedDict):
     bench_config: BenchmarkConfig
     blik: AlgorithmMetrics
@@ -42,6 +50,7 @@ class BenchmarkResult(TypedDict):
     end: int
     instance: InstanceData
     start: int
+    timing: dict[str, TimedScopeData]
 
 
 # Example for handling multiple test cases in a JSON file
@@ -107,6 +116,7 @@ def preprocess(data: BenchmarkData) -> ProcessedRunList:
         processed_data = set_keys(processed_data, run_data, "edmond")
         processed_data = set_keys(processed_data, run_data, "push_relabel")
         processed_data = set_keys(processed_data, run_data, "state_change")
+        processed_data = set_keys(processed_data, run_data, "timing")
 
         processed_runs.append(processed_data)
 
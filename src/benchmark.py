@@ -1,11 +1,15 @@
+import copy
+import functools
+import os
+import threading
 import time
 import json
-from typing import Callable, cast
+from typing import Callable, ParamSpec, TypeVar, cast
 import numpy as np
 from pathlib import Path
 
 type BenchSimples = float | str | int
-type BenchValue = dict[str, BenchValue] | BenchSimples
+type BenchValue = dict[str, BenchValue] | list[BenchValue] | BenchSimples
 type BenchType = dict[str, dict[str, BenchValue]]
 
 bench_info: BenchType = {}
@@ -13,18 +17,201 @@ cur_bench = None
 bench_scope = ""
 init_time = int(time.time())
 
+# Whether a benchmark is running. Hot paths check this before doing any
+# instrumentation, so a solve outside of a benchmark pays nothing for it.
+active = False
+
+# Counters are kept apart from bench_info in a flat list, indexed by slots
+# handed out by counter(), and only merged into bench_info by results(). A
+# counter which is still 0 is left out, like a key that was never registered.
+counter_keys: list[str] = []
+counter_slots: dict[str, int] = {}
+counts: list[int | float] = []
+bench_counts: dict[str, list[int | float]] = {}  # counts of finished benchmarks
+
+
+def counter(key: str) -> int:
+    """
+    Returns the slot of the counter at the full key, declaring it if needed.
+    Hot paths declare their counters once and increment `counts[slot]`.
+    """
+    slot = counter_slots.get(key)
+    if slot is None:
+        slot = counter_slots[key] = len(counter_keys)
+        counter_keys.append(key)
+        counts.append(0)
+    return slot
+
+
+class TimedScope:
+    """
+    A node in the tree of timed scopes of a benchmark. The children of a scope
+    are the scopes entered while it is the innermost one.
+    """
+
+    __slots__ = ("calls", "children", "sampled_ns", "samples", "total_ns")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.samples = 0
+        self.sampled_ns = 0
+        self.children: dict[str, TimedScope] = {}
+
+    def total_sampled_ns(self) -> int:
+        return self.sampled_ns + sum(
+            child.total_sampled_ns() for child in self.children.values()
+        )
+
+    def to_json(self) -> dict[str, BenchValue]:
+        """
+        Cumulative time includes the time spent in child scopes, self time
+        does not. In sampling mode both are estimated from the samples.
+        """
+        if sampling_interval_s is None:
+            children_ns = sum(child.total_ns for child in self.children.values())
+            cumulative_s = self.total_ns / 1e9
+            self_s = (self.total_ns - children_ns) / 1e9
+        else:
+            cumulative_s = self.total_sampled_ns() / 1e9
+            self_s = self.sampled_ns / 1e9
+
+        res: dict[str, BenchValue] = {
+            "calls": self.calls,
+            "cumulative_s": cumulative_s,
+            "self_s": self_s,
+        }
+        if sampling_interval_s is not None:
+            res["samples"] = self.samples
+        if self.children:
+            res["children"] = {
+                name: child.to_json() for name, child in self.children.items()
+            }
+        return res
+
+
+# Timed scopes of every benchmark, and the stack of scopes currently entered.
+# The root is the benchmark itself and is never timed. The clock at every entry
+# is kept on its own stack, since a scope can be entered again before it is left.
+bench_timings: dict[str, TimedScope] = {}
+scope_stack: list[TimedScope] = []
+entered_ns_stack: list[int] = []
+
+# In sampling mode, entering and leaving a scope does not read the clock.
+# Instead a thread wakes up every sampling_interval_s seconds and charges the
+# time since its last sample to the innermost scope. The interval is a lower
+# bound, as the thread also has to wait for the GIL. Enable it with
+# BENCHMARK_SAMPLING=<interval>.
+sampling_interval_s: float | None = (
+    float(os.environ["BENCHMARK_SAMPLING"])
+    if os.environ.get("BENCHMARK_SAMPLING")
+    else None
+)
+_sampler: tuple[threading.Thread, threading.Event] | None = None
+
+
+def _sample(interval_s: float, stop: threading.Event):
+    last = time.perf_counter_ns()
+    while not stop.wait(interval_s):
+        now = time.perf_counter_ns()
+        if scope_stack:
+            scope = scope_stack[-1]
+            scope.samples += 1
+            scope.sampled_ns += now - last
+        last = now
+
+
+Param = ParamSpec("Param")
+RetType = TypeVar("RetType")
+
+
+class timed:
+    """
+    Times a region of code as a scope nested in the enclosing timed scopes,
+    either as a context manager or as a decorator:
+
+        with benchmark.timed("relabel"):
+            ...
+
+    Does nothing when no benchmark is running.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        if not active:
+            return
+
+        parent = scope_stack[-1]
+        scope = parent.children.get(self.name)
+        if scope is None:
+            scope = parent.children[self.name] = TimedScope()
+
+        scope.calls += 1
+        scope_stack.append(scope)
+        if sampling_interval_s is None:
+            entered_ns_stack.append(time.perf_counter_ns())
+
+    def __exit__(self, *_):
+        if not active:
+            return
+
+        scope = scope_stack.pop()
+        if sampling_interval_s is None:
+            scope.total_ns += time.perf_counter_ns() - entered_ns_stack.pop()
+
+    def __call__(self, func: Callable[Param, RetType]) -> Callable[Param, RetType]:
+        @functools.wraps(func)
+        def wrapper(*args: Param.args, **kwargs: Param.kwargs) -> RetType:
+            if not active:
+                return func(*args, **kwargs)
+
+            with self:
+                return func(*args, **kwargs)
+
+        return wrapper
+
 
 def start_benchmark(id: str):
-    global cur_bench
+    global cur_bench, active, _sampler
     cur_bench = id
+    active = True
     bench_scope = ""
     bench_info[cur_bench] = {"start": time.time_ns()}
+    counts[:] = [0] * len(counts)
+
+    bench_timings[cur_bench] = root = TimedScope()
+    scope_stack[:] = [root]
+    entered_ns_stack.clear()
+    if sampling_interval_s is not None and _sampler is None:
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=_sample, args=(sampling_interval_s, stop), daemon=True
+        )
+        thread.start()
+        _sampler = (thread, stop)
+
+
+def _stop_sampler():
+    global _sampler
+    if _sampler is not None:
+        thread, stop = _sampler
+        stop.set()
+        thread.join()
+        _sampler = None
 
 
 def _set(key: str, value: BenchValue):
     if cur_bench is None:
         return
 
+    if (slot := counter_slots.get(key)) is not None:
+        counts[slot] = cast(int | float, value)
+        return
+
     cur = bench_info[cur_bench]
 
     keys = key.split(".")
@@ -40,6 +227,9 @@ def _get[A](key: str) -> A | None:
     if cur_bench is None:
         return None
 
+    if (slot := counter_slots.get(key)) is not None:
+        return cast(A, counts[slot] or None)
+
     cur = bench_info[cur_bench]
 
     keys = key.split(".")
@@ -56,6 +246,9 @@ def register(key: str, value: BenchValue):
 
 
 def register_s(key: str, value: BenchValue):
+    if cur_bench is None:
+        return
+
     register(f"{bench_scope}.{key}", value)
 
 
@@ -67,6 +260,9 @@ def get_or_default[A: BenchValue](key: str, default: A) -> A | None:
 
 
 def get_or_default_s[A: BenchValue](key: str, default: A) -> A | None:
+    if cur_bench is None:
+        return None
+
     return get_or_default(f"{bench_scope}.{key}", default)
 
 
@@ -84,11 +280,41 @@ def register_or_update[A: BenchValue](key: str, default: A, updater: Callable[[A
 def register_or_update_s[A: BenchValue](
     key: str, default: A, updater: Callable[[A], A]
 ):
+    if cur_bench is None:
+        return
+
     register_or_update(f"{bench_scope}.{key}", default, updater)
 
 
+def append(key: str, value: BenchValue):
+    """Appends value to the list at key, starting a new list if needed."""
+    if cur_bench is None:
+        return
+
+    values = cast(list[BenchValue] | None, _get(key))
+    if values is None:
+        _set(key, [value])
+    else:
+        values.append(value)
+
+
+def count(key: str, amount: int = 1):
+    """Adds amount to the counter at key, starting it at amount."""
+    if cur_bench is None:
+        return
+
+    counts[counter(key)] += amount
+
+
+def count_s(key: str, amount: int = 1):
+    if cur_bench is None:
+        return
+
+    count(f"{bench_scope}.{key}", amount)
+
+
 def end_benchmark():
-    global cur_bench
+    global cur_bench, active
 
     if cur_bench is None:
         return
@@ -98,7 +324,12 @@ def end_benchmark():
 
     _set("end", end)
     _set("duration_s", (end - start) / 1e9)
+    bench_counts[cur_bench] = counts.copy()
+    _stop_sampler()
+    scope_stack.clear()
+    entered_ns_stack.clear()
     cur_bench = None
+    active = False
 
     # so we have the data if we kill the program or it crashes
     write_benchmark(f"benchmark-tmp-{init_time}.json")
@@ -114,7 +345,7 @@ def write_benchmark(filename: str | None = None):
         filename = f"benchmark-{int(time.time())}.json"
 
     with open(dir / filename, "w") as f:
-        json.dump(bench_info, f, cls=NpEncoder, indent=4, sort_keys=True)
+        json.dump(results(), f, cls=NpEncoder, indent=4, sort_keys=True)
 
     if "tmp" not in filename:
         tmp_file = dir / f"benchmark-tmp-{init_time}.json"
@@ -122,16 +353,50 @@ def write_benchmark(filename: str | None = None):
             tmp_file.unlink()
 
 
+def results() -> BenchType:
+    """
+    Returns bench_info with the counters of every benchmark merged into it.
+    """
+    merged: BenchType = {}
+    for id, info in bench_info.items():
+        values = counts if id == cur_bench else bench_counts.get(id, [])
+
+        merged[id] = info = copy.deepcopy(info)
+        for key, value in zip(counter_keys, values):
+            if value == 0:
+                continue
+
+            cur = info
+            keys = key.split(".")
+            for key in keys[:-1]:
+                cur = cast(dict[str, BenchValue], cur.setdefault(key, {}))
+            cur[keys[-1]] = value
+
+        if (root := bench_timings.get(id)) is not None and root.children:
+            info["timing"] = {
+                name: scope.to_json() for name, scope in root.children.items()
+            }
+
+    return merged
+
+
 def set_bench_scope(scope: str):
     global bench_scope
     bench_scope = scope
 
 
 def clear():
-    global bench_info, bench_scope, cur_bench
+    global bench_info, bench_counts, bench_timings, bench_scope, cur_bench, active
+    _stop_sampler()
     bench_info = {}
+    bench_counts = {}
+    bench_timings = {}
+    scope_stack.clear()
+    entered_ns_stack.clear()
     bench_scope = ""
     cur_bench = None
+    active = False
+    counts[:] = [0] * len(counts)
 
 
 class NpEncoder(json.JSONEncoder):
@@ -3,9 +3,33 @@ Pseudocode for computing expander decomposition via sparse cuts.
 Based on the approach described in "Maximum Flow by Augmenting Paths in n^2+o(1) Time".
 """
 
-from collections import defaultdict
-from src.sparse_cut import sparse_cut
-from src.utils import Edge, Graph, Vertex
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+import logging
+
+import numpy as np
+import numpy.typing as npt
+
+from src import benchmark
+from src.sparse_cut import ShortestPaths, sparse_cut
+from src.utils import Edge, Graph, InducedSubgraph, Vertex, arc_id_mask
+from src.weighted_push_relabel import WarmStart
+
+# Silent unless configured, e.g. with logging.basicConfig(level=logging.DEBUG).
+# INFO logs what happens to every component, DEBUG also dumps their vertices.
+logger = logging.getLogger(__name__)
+
+type Component = tuple[Graph, dict[Vertex, int], dict[Vertex, int], WarmStart]
+type Cut = tuple[tuple[set[Vertex], set[Vertex], set[Edge]], WarmStart]
+
+# The input graph and cut_component of the running expander_decomposition, set
+# once in every worker process by init_worker, so that the components are sent
+# as their vertices instead of as views which pickle the whole input graph
+_worker_graph: Graph | None = None
+_worker_cut: Callable[[Component], Cut] | None = None
 
 
 def expander_decomposition(
@@ -15,6 +39,9 @@ def expander_decomposition(
     H: dict[int, set[Edge]],
     c_6_5: int = 1,  # Constant from the paper
     phi: float = 0.1,  # Phi parameter from the paper
+    shortest_paths: ShortestPaths | None = None,
+    warm_start: bool = False,
+    processes: int | None = 1,
 ) -> set[Edge]:
     """
     Computes a ϕ-expander decomposition of graph G with respect to terminal set F.
@@ -31,153 +58,239 @@ def expander_decomposition(
         H: Expander hierarchy
         c_6_5: Constant from the paper
         phi: Phi parameter from the paper
+        shortest_paths: Passed on to sparse_cut, must be picklable if
+            processes is not 1
+        warm_start: Start push-relabel on both sides of a cut from the flow and
+            labels of the component they were cut from, instead of from zero.
+            This finds different, usually larger, cuts
+        processes: Number of worker processes running the sparse cuts of
+            independent components at once, or None for one per CPU. The
+            result doesn't depend on it, but the benchmark only records the
+            sparse cuts which run in this process. Every worker gets G and F
+            once, and then only the vertices of its components.
 
     Returns:
     - X: Separator set such that F is ϕ-expanding in G \\ X
     """
-    G_init, c, sources_init, sinks_init = I
+    G_init, _, sources_init, sinks_init = I
 
     # Initialize working variables
-    queue = [(G_init, sources_init, sinks_init)]
+    queue = deque([(G_init, sources_init, sinks_init, WarmStart())])
     X: set[Edge] = set()  # Accumulates cut edges
     U: list[set[Vertex]] = []  # Collection of vertex sets
 
-    # Process each strongly connected component
-    while len(queue) > 0:
-        G, sources, sinks = queue.pop(0)
-
-        print("\n================")
-        if len(G.V) <= 1:
-            print("Trivially expanding due to 1 vertex", G.V)
-            U.append(set(G.V))
-            continue
-
-        # Check if trivially expanding
-        sum_vol = sum(G.volume(v) for v in G.V)
-        print(f"Sum volume: {sum_vol} for vertices {G.V}, 1/phi: {1 / phi}")
-        if sum_vol < 1 / phi:
-            print(f"Trivially expanding since not {sum_vol} < {1 / phi}", G.V)
-            U.append(set(G.V))
-            # Small volume makes F trivially ϕ-expanding
-            continue
-
-        if not (1 / phi <= len(G.V)):
-            print(f"Trivially expanding since not {1 / phi} <= {len(G.V)}", G.V)
-            U.append(set(G.V))
-            # Small volume makes F trivially ϕ-expanding
-            continue
-
-        print(
-            "Processing component with vertices:",
-            G.V,
-            " sinks, sources:",
-            sinks,
-            sources,
-        )
+    # Shared by every component, which only look up their own edges
+    in_F = arc_id_mask(G_init, F)
+
+    cut = partial(
+        cut_component,
+        in_F=in_F,
+        kappa=kappa,
+        H=H,
+        c_6_5=c_6_5,
+        phi=phi,
+        shortest_paths=shortest_paths,
+        warm_start=warm_start,
+    )
 
-        # Subgraph induced by the component
-        F_component = F.intersection(G.all_edges())
-
-        # Try to find a sparse cut or certify that F is expanding
-        _, cut = sparse_cut(
-            I=(
-                G,
-                G.c,
-                sources,
-                sinks,
-            ),
-            kappa=min(len(G.V), kappa),
-            F=F_component,
-            H=H,
-            c_6_5=c_6_5,
-            phi=phi,
-            # TODO: w_H
-        )
+    with (
+        ProcessPoolExecutor(processes, initializer=init_worker, initargs=(G_init, cut))
+        if processes != 1
+        else nullcontext()
+    ) as pool:
+        # Process each strongly connected component. The components in the
+        # queue share no vertices, so their sparse cuts are independent and run
+        # at once. The results are merged in queue order, which gives the same
+        # X and U as processing the components one at a time.
+        while len(queue) > 0:
+            components = [queue.popleft() for _ in range(len(queue))]
+            expanding = [trivially_expanding(G, phi) for G, *_ in components]
+            to_cut = [
+                (G, sources, sinks, state)
+                for (G, sources, sinks, state), trivial in zip(components, expanding)
+                if not trivial
+            ]
+            if pool:
+                cuts = iter(pool.map(cut_in_worker, map(component_vertices, to_cut)))
+            else:
+                cuts = iter(map(cut, to_cut))
+
+            for (G, sources, sinks, state), trivial in zip(components, expanding):
+                benchmark.count("expander_decomposition.components")
+                if trivial:
+                    benchmark.count("expander_decomposition.trivially_expanding")
+                    U.append(set(G.V))
+                    continue
+
+                (S, S_hat, edges), state = next(cuts)
+
+                if len(S) == 0 and len(S_hat) == 0:
+                    logger.info("Already expanding")
+                    benchmark.count("expander_decomposition.expanding")
+                    # F is already ϕ-expanding in this component, nothing to do
+                    U.append(set(G.V))
+                    continue
+                else:
+                    logger.info(
+                        "Cut of %d edges splits off %d vertices", len(edges), len(S)
+                    )
+                    logger.debug("Edges added to cut %s", edges)
+                    benchmark.count("expander_decomposition.cuts")
+                    # Add cut edges to separator
+                    X.update(edges)
+
+                    # Recurse on both sides of the cut
+                    for side in (S, S_hat):
+                        G_side = subgraph(G, side)
+                        queue.append(
+                            (
+                                G_side,
+                                *select_sources_and_sinks(G_side),
+                                state.restrict(G, G_side),
+                            )
+                        )
+
+    logger.info("Final cut of %d edges into %d vertex sets", len(X), len(U))
+    logger.debug("Final cut %s, vertex sets %s", X, U)
+    return X
 
-        S, S_hat, edges = cut
 
-        if len(S) == 0 and len(S_hat) == 0:
-            print("Already expanding", G.V)
-            # F is already ϕ-expanding in this component, nothing to do
-            U.append(set(G.V))
-            continue
-        else:
-            print("Edges added to cut", edges)
-            # Add cut edges to separator
-            X.update(edges)
+def trivially_expanding(G: Graph, phi: float) -> bool:
+    """
+    Whether F is ϕ-expanding in the component G just because it is small.
+    """
+    if len(G.V) <= 1:
+        logger.info("Trivially expanding due to %d vertex", len(G.V))
+        return True
 
-            # Recurse on both sides of the cut
-            G_S = subgraph(G, c, S)
-            G_S_hat = subgraph(G, c, S_hat)
+    # Small volume makes F trivially ϕ-expanding
+    sum_vol = sum(G.volume(v) for v in G.V)
+    if sum_vol < 1 / phi:
+        logger.info("Trivially expanding since volume %d < 1/phi", sum_vol)
+        return True
 
-            queue.append((G_S, *select_sources_and_sinks(G_S)))
-            queue.append((G_S_hat, *select_sources_and_sinks(G_S_hat)))
+    if not (1 / phi <= len(G.V)):
+        logger.info("Trivially expanding since %d vertices < 1/phi", len(G.V))
+        return True
 
-    print("Final cut", X)
-    print("Vertex sets", U)
-    return X
+    return False
+
+
+def init_worker(G: Graph, cut: Callable[[Component], Cut]):
+    """
+    Keeps the input graph and cut_component of expander_decomposition in a
+    worker process.
+    """
+    global _worker_graph, _worker_cut
+    _worker_graph, _worker_cut = G, cut
+
+
+def component_vertices(
+    component: Component,
+) -> tuple[list[Vertex] | None, dict[Vertex, int], dict[Vertex, int], WarmStart]:
+    """
+    Replaces the graph of a component by its vertices, or None for the input
+    graph, see cut_in_worker.
+    """
+    G, sources, sinks, state = component
+    return (G.V if isinstance(G, InducedSubgraph) else None, sources, sinks, state)
 
 
-def subgraph(
-    G: Graph,
-    c: list[int],
-    vertices: set[Vertex],
-) -> Graph:
+def cut_in_worker(
+    component: tuple[
+        list[Vertex] | None, dict[Vertex, int], dict[Vertex, int], WarmStart
+    ],
+) -> Cut:
     """
-    Returns the subgraph of G induced by the given vertices.
+    Runs cut_component in a worker process set up by init_worker on the view
+    of the input graph induced by the vertices of the component.
     """
+    assert _worker_graph is not None and _worker_cut is not None
+    vertices, sources, sinks, state = component
+    G = _worker_graph if vertices is None else subgraph(_worker_graph, vertices)
+    return _worker_cut((G, sources, sinks, state))
 
-    new_edges: list[tuple[int, int]] = []
 
-    for edge in G.E:
-        u, v = edge
-        if u in vertices and v in vertices:
-            new_edges.append(edge)
+def cut_component(
+    component: Component,
+    in_F: npt.NDArray[np.bool_],
+    kappa: int,
+    H: dict[int, set[Edge]],
+    c_6_5: int,
+    phi: float,
+    shortest_paths: ShortestPaths | None,
+    warm_start: bool,
+) -> Cut:
+    """
+    Tries to find a sparse cut of the component (G, sources, sinks, state), or
+    certify that F, given by its arc_id_mask, is expanding in it. Returns the
+    cut, and the state the sparse cut ended in, since it is lost when run in
+    another process.
+    """
+    G, sources, sinks, state = component
+
+    logger.info("Processing component of %d vertices", len(G.V))
+    logger.debug("Component vertices %s, sources %s, sinks %s", G.V, sources, sinks)
 
-    return Graph(
-        list(vertices),
-        new_edges,
-        c,  # Just use c, since we use edge.id to lookup capacities
+    _, cut = sparse_cut(
+        I=(
+            G,
+            G.c,
+            sources,
+            sinks,
+        ),
+        kappa=min(len(G.V), kappa),
+        F=in_F,
+        H=H,
+        c_6_5=c_6_5,
+        phi=phi,
+        # TODO: w_H
+        shortest_paths=shortest_paths,
+        warm_start=state if warm_start else None,
     )
+    return cut, state
+
+
+def subgraph(G: Graph, vertices: Iterable[Vertex]) -> InducedSubgraph:
+    """
+    Returns a view of the subgraph of G induced by the given vertices, whose
+    edges keep their ids and capacities in the input graph.
+    """
+    return InducedSubgraph(G, vertices)
 
 
 def select_sources_and_sinks(G: Graph) -> tuple[dict[Vertex, int], dict[Vertex, int]]:
+    """
+    Makes the vertices of the largest out-degree sources and the other vertices
+    of the largest in-degree sinks, each with the capacity of its incident
+    edges.
+    """
     if len(G.V) <= 1:
         return {}, {}
 
-    out_degrees: dict[int, set[Vertex]] = defaultdict(set)
-    in_degrees: dict[int, set[Vertex]] = defaultdict(set)
-
-    for u in G.V:
-        out_degrees[len(list(filter(lambda t: t.forward, G.outgoing[u])))].add(u)
-        in_degrees[len(list(filter(lambda t: t.forward, G.incoming[u])))].add(u)
-
-    largest_out_degree = max(out_degrees.keys())
-
-    sources = {
-        v: sum(G.c[e.id] for e in G.outgoing[v])
-        for v in out_degrees[largest_out_degree]
-    }
-
-    sinks = {}
-    for degree in sorted(list(in_degrees.keys()), reverse=True):
-        sinks = {
-            v: sum(G.c[e.id] for e in G.incoming[v])
-            for v in in_degrees[degree]
-            if v not in sources
-        }
-        print(degree, sinks, in_degrees, in_degrees[degree])
-
-        if len(sinks) > 0:
-            break
-
-    if len(sinks) == 0 and len(sources) > 1 and len(in_degrees) == 1:
-        largest_in_degree = max(in_degrees.keys())
-        sinks = {
-            v: sum(G.c[e.id] for e in G.incoming[v])
-            for v in in_degrees[largest_in_degree]
-        }
-        del sources[in_degrees[largest_in_degree].pop()]
+    csr = G.csr
+    vertices = csr.vertices.tolist()
+    out_degree = np.bincount(csr.tails[csr.forward], minlength=csr.n)
+    in_degree = np.bincount(csr.tails[~csr.forward], minlength=csr.n)
+    capacity = np.concatenate(([0], np.cumsum(csr.capacities)))
+    volume = (capacity[csr.offsets[1:]] - capacity[csr.offsets[:-1]]).tolist()
+
+    is_source = out_degree == out_degree.max()
+    is_sink = ~is_source
+    if is_sink.any():
+        degree = in_degree[is_sink].max()
+        logger.debug("Sinks of in-degree %d", degree)
+        is_sink &= in_degree == degree
+
+    sources = {vertices[x]: volume[x] for x in np.flatnonzero(is_source).tolist()}
+    sinks = {vertices[x]: volume[x] for x in np.flatnonzero(is_sink).tolist()}
+
+    # Every vertex is a source of the same in-degree, so they all become sinks,
+    # and the first of them is no longer a source
+    if len(sinks) == 0 and len(sources) > 1 and (in_degree == in_degree[0]).all():
+        is_sink = in_degree == in_degree.max()
+        sinks = {vertices[x]: volume[x] for x in np.flatnonzero(is_sink).tolist()}
+        del sources[next(iter(sinks))]
     elif len(sinks) == 0:
         raise ValueError(
             "No sinks found, check the graph structure or the source selection logic."
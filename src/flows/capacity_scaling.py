@@ -1,10 +1,10 @@
-from collections import deque, defaultdict
+from collections import deque
 from dataclasses import dataclass, field
 
 from src import benchmark
 
 from src.flows.utils import finish_benchmark, benchmark_iteration
-from src.utils import Edge, Vertex, Graph
+from src.utils import Graph
 
 INF = 1000000000
 
@@ -12,24 +12,41 @@ INF = 1000000000
 @dataclass
 class CapacityScaling:
     g: Graph
-    s: Vertex
-    t: Vertex
+    s: int
+    t: int
 
-    flow: defaultdict[Edge, int] = field(default_factory=defaultdict)
+    flow: list[int] = field(default_factory=list)
+
+    # G.csr copied into lists, which are faster than NumPy for scalar access
+    offsets: list[int] = field(default_factory=list)
+    tails: list[int] = field(default_factory=list)
+    targets: list[int] = field(default_factory=list)
+    capacities: list[int] = field(default_factory=list)
+    edge_ids: list[int] = field(default_factory=list)
+    forward: list[bool] = field(default_factory=list)
 
     def __init__(self, G: Graph):
         self.g = G
 
-    def c_f(self, edge: Edge) -> int:
-        if edge.forward:
-            return edge.c - self.flow[edge]
+        csr = G.csr
+        self.offsets = csr.offsets.tolist()
+        self.targets = csr.targets.tolist()
+        self.tails = csr.tails.tolist()
+        self.capacities = csr.capacities.tolist()
+        self.edge_ids = csr.edge_ids.tolist()
+        self.forward = csr.forward.tolist()
+
+    def c_f(self, a: int) -> int:
+        f_e = self.flow[self.edge_ids[a]]
+        if self.forward[a]:
+            return self.capacities[a] - f_e
         else:
-            return self.flow[edge.reversed()]
+            return f_e
 
-    def bfs(self, delta: int) -> tuple[int, dict[Vertex, Edge] | None]:
-        parent: dict[Vertex, Edge] = {}
+    def bfs(self, delta: int) -> tuple[int, dict[int, int] | None]:
+        parent: dict[int, int] = {}
 
-        q: deque[tuple[Vertex, int]] = deque()
+        q: deque[tuple[int, int]] = deque()
         q.append((self.s, INF))
 
         visited = {self.s}
@@ -37,17 +54,17 @@ class CapacityScaling:
         while q:
             u, flow = q.popleft()
 
-            for edge in self.g.outgoing[u]:
-                v = edge.v
+            for a in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[a]
 
                 if v in visited:
                     continue
 
-                cap = self.c_f(edge)
+                cap = self.c_f(a)
 
                 if cap >= delta:
                     visited.add(v)
-                    parent[v] = edge
+                    parent[v] = a
                     new_flow = min(flow, cap)
                     if v == self.t:
                         return new_flow, parent
@@ -55,13 +72,13 @@ class CapacityScaling:
 
         return 0, None
 
-    def max_flow(self, s: Vertex, t: Vertex) -> int:
+    def max_flow(self, s: int, t: int) -> int:
         benchmark.set_bench_scope("capacity")
 
-        self.s = s
-        self.t = t
+        self.s = self.g.csr.index[s]
+        self.t = self.g.csr.index[t]
 
-        self.flow = defaultdict(int)
+        self.flow = [0] * self.g.csr.m
 
         flow = 0
 
@@ -82,14 +99,13 @@ class CapacityScaling:
                 cur = self.t
                 edge_updates = 0
                 while cur != self.s:
-                    edge = parent[cur]
-                    cur = edge.u
+                    a = parent[cur]
+                    cur = self.tails[a]
 
-                    if edge.forward:
-                        self.flow[edge] = self.flow[edge] + new_flow
+                    if self.forward[a]:
+                        self.flow[self.edge_ids[a]] += new_flow
                     else:
-                        edge = edge.reversed()
-                        self.flow[edge] = self.flow[edge] - new_flow
+                        self.flow[self.edge_ids[a]] -= new_flow
 
                     edge_updates += 2
                 benchmark_iteration(edge_updates)
@@ -1,10 +1,10 @@
-from collections import defaultdict, deque
+from collections import deque
 from dataclasses import dataclass, field
 
 from flows.utils import benchmark_iteration, finish_benchmark
 
 from src import benchmark
-from src.utils import Edge, Graph, Vertex
+from src.utils import Graph
 
 INF = 1000000000
 
@@ -13,40 +13,56 @@ INF = 1000000000
 class PushRelabel:
     g: Graph
     n: int
-    s: Vertex
-    t: Vertex
+    s: int
+    t: int
 
-    height: dict[Vertex, int] = field(default_factory=dict)
-    excess: dict[Vertex, int] = field(default_factory=dict)
+    height: list[int] = field(default_factory=list)
+    excess: list[int] = field(default_factory=list)
 
-    flow: defaultdict[Edge, int] = field(default_factory=defaultdict)
+    flow: list[int] = field(default_factory=list)
 
-    active_node_queue: deque[Vertex] = field(default_factory=deque)
-    is_active: dict[Vertex, bool] = field(default_factory=dict)
+    active_node_queue: deque[int] = field(default_factory=deque)
+    is_active: list[bool] = field(default_factory=list)
 
     edge_updates: int = 0
 
+    # G.csr copied into lists, which are faster than NumPy for scalar access
+    offsets: list[int] = field(default_factory=list)
+    tails: list[int] = field(default_factory=list)
+    targets: list[int] = field(default_factory=list)
+    capacities: list[int] = field(default_factory=list)
+    edge_ids: list[int] = field(default_factory=list)
+    forward: list[bool] = field(default_factory=list)
+
     def __init__(self, G: Graph):
         """Initialize push-relabel algorithm with n vertices."""
         self.g = G
         self.n = len(G.V)
 
-    def c_f(self, edge: Edge) -> int:
-        if edge.forward:
-            return edge.c - self.flow[edge]
+        csr = G.csr
+        self.offsets = csr.offsets.tolist()
+        self.targets = csr.targets.tolist()
+        self.tails = csr.tails.tolist()
+        self.capacities = csr.capacities.tolist()
+        self.edge_ids = csr.edge_ids.tolist()
+        self.forward = csr.forward.tolist()
+
+    def c_f(self, a: int) -> int:
+        f_e = self.flow[self.edge_ids[a]]
+        if self.forward[a]:
+            return self.capacities[a] - f_e
         else:
-            return self.flow[edge.reversed()]
+            return f_e
 
-    def push(self, edge: Edge, to_push: int | None = None) -> None:
-        u, v = edge.u, edge.v
+    def push(self, a: int, to_push: int | None = None) -> None:
+        u, v = self.tails[a], self.targets[a]
         if to_push is None:
-            to_push = min(self.excess[u], self.c_f(edge))
+            to_push = min(self.excess[u], self.c_f(a))
 
-        if edge.forward:
-            self.flow[edge] = self.flow[edge] + to_push
+        if self.forward[a]:
+            self.flow[self.edge_ids[a]] += to_push
         else:
-            edge = edge.reversed()
-            self.flow[edge] = self.flow[edge] - to_push
+            self.flow[self.edge_ids[a]] -= to_push
 
         self.excess[u] -= to_push
         self.excess[v] += to_push
@@ -58,28 +74,32 @@ class PushRelabel:
             self.is_active[v] = True
 
     def relabel(self, u: int) -> None:
-        benchmark.register_or_update("push_relabel.relabels", 1, lambda x: x + 1)
+        benchmark.count("push_relabel.relabels")
 
         d = INF
-        for edge in self.g.outgoing[u]:
-            if self.c_f(edge) > 0:
-                d = min(d, self.height[edge.v])
+        for a in range(self.offsets[u], self.offsets[u + 1]):
+            if self.c_f(a) > 0:
+                d = min(d, self.height[self.targets[a]])
 
         if d < INF:
             new_height = d + 1
             self.height[u] = new_height
 
-            benchmark.register_or_update_s(
-                "highest_level", new_height, lambda x: max(x, new_height)
-            )
+            if benchmark.active:
+                benchmark.register_or_update_s(
+                    "highest_level", new_height, lambda x: max(x, new_height)
+                )
 
     def discharge(self, u: int):
         while self.excess[u] > 0:
             pushed = False
 
-            for edge in self.g.outgoing[u]:
-                if self.c_f(edge) > 0 and self.height[u] == self.height[edge.v] + 1:
-                    self.push(edge)
+            for a in range(self.offsets[u], self.offsets[u + 1]):
+                if (
+                    self.c_f(a) > 0
+                    and self.height[u] == self.height[self.targets[a]] + 1
+                ):
+                    self.push(a)
                     pushed = True
                     if self.excess[u] == 0:
                         return
@@ -91,25 +111,26 @@ class PushRelabel:
         benchmark.set_bench_scope("push_relabel")
 
         # == Init ==
-        self.s = s
-        self.t = t
+        n = self.g.csr.n
+        self.s = s = self.g.csr.index[s]
+        self.t = t = self.g.csr.index[t]
 
-        self.height = {u: 0 for u in self.g.V}
+        self.height = [0] * n
         self.height[s] = self.n
 
         self.active_node_queue = deque()
-        self.is_active = {u: False for u in self.g.V}
+        self.is_active = [False] * n
 
-        self.excess = {u: 0 for u in self.g.V}
+        self.excess = [0] * n
 
-        self.flow = defaultdict(int)
-        for edge in self.g.outgoing[s]:
-            if not edge.forward:
+        self.flow = [0] * self.g.csr.m
+        for a in range(self.offsets[s], self.offsets[s + 1]):
+            if not self.forward[a]:
                 continue
 
-            self.push(edge, edge.c)
+            self.push(a, self.capacities[a])
 
-        for u in self.g.V:
+        for u in range(n):
             if u != s and u != t and self.excess[u] > 0 and not self.is_active[u]:
                 self.active_node_queue.append(u)
                 self.is_active[u] = True
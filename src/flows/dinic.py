@@ -1,9 +1,9 @@
 from flows.utils import benchmark_iteration, finish_benchmark
 from src import benchmark
-from collections import defaultdict, deque
+from collections import deque
 from dataclasses import dataclass, field
 
-from src.utils import Edge, Vertex, Graph
+from src.utils import Graph
 
 INF = 1000000000
 
@@ -11,72 +11,86 @@ INF = 1000000000
 @dataclass
 class Dinic:
     g: Graph
-    s: Vertex
-    t: Vertex
+    s: int
+    t: int
 
-    flow: defaultdict[Edge, int] = field(default_factory=defaultdict)
+    flow: list[int] = field(default_factory=list)
 
-    level: dict[Vertex, int] = field(default_factory=dict)
-    ptr: dict[Vertex, int] = field(default_factory=dict)
-    edge_adj: dict[Vertex, list[Edge]] = field(default_factory=dict)
+    level: list[int] = field(default_factory=list)
+    ptr: list[int] = field(default_factory=list)
 
     edge_updates: int = 0
 
+    # G.csr copied into lists, which are faster than NumPy for scalar access
+    offsets: list[int] = field(default_factory=list)
+    targets: list[int] = field(default_factory=list)
+    capacities: list[int] = field(default_factory=list)
+    edge_ids: list[int] = field(default_factory=list)
+    forward: list[bool] = field(default_factory=list)
+
     def __init__(self, G: Graph):
         self.g = G
 
-    def c_f(self, edge: Edge) -> int:
-        if edge.forward:
-            return edge.c - self.flow[edge]
+        csr = G.csr
+        self.offsets = csr.offsets.tolist()
+        self.targets = csr.targets.tolist()
+        self.capacities = csr.capacities.tolist()
+        self.edge_ids = csr.edge_ids.tolist()
+        self.forward = csr.forward.tolist()
+
+    def c_f(self, a: int) -> int:
+        f_e = self.flow[self.edge_ids[a]]
+        if self.forward[a]:
+            return self.capacities[a] - f_e
         else:
-            return self.flow[edge.reversed()]
+            return f_e
 
     def bfs(self) -> bool:
-        self.level = {u: -1 for u in self.g.V}
+        self.level = [-1] * self.g.csr.n
         self.level[self.s] = 0
 
-        q: deque[Vertex] = deque()
+        q: deque[int] = deque()
         q.append(self.s)
 
         while q:
             u = q.popleft()
 
-            for edge in self.g.outgoing[u]:
-                v = edge.v
-                if self.c_f(edge) > 0 and self.level[v] == -1:
+            for a in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[a]
+                if self.c_f(a) > 0 and self.level[v] == -1:
                     self.level[v] = self.level[u] + 1
                     q.append(v)
 
         return self.level[self.t] != -1
 
-    def dfs(self, u: Vertex, limit: int) -> int:
+    def dfs(self, u: int, limit: int) -> int:
         if limit == 0:
             return 0
         if u == self.t:
             return limit
 
-        if u not in self.edge_adj:
+        if self.level[u] == -1:
             return 0
 
-        while self.ptr[u] < len(self.edge_adj[u]):
-            edge = self.edge_adj[u][self.ptr[u]]
-            v = edge.v
+        while self.ptr[u] < self.offsets[u + 1]:
+            a = self.ptr[u]
+            v = self.targets[a]
 
-            if self.c_f(edge) == 0 or self.level[v] != self.level[u] + 1:
+            if self.c_f(a) == 0 or self.level[v] != self.level[u] + 1:
                 self.ptr[u] += 1
                 continue
 
-            new_flow = min(limit, self.c_f(edge))
+            new_flow = min(limit, self.c_f(a))
             new_flow = self.dfs(v, new_flow)
 
             if new_flow == 0:
                 self.ptr[u] += 1
                 continue
 
-            if edge.forward:
-                self.flow[edge] += new_flow
+            if self.forward[a]:
+                self.flow[self.edge_ids[a]] += new_flow
             else:
-                self.flow[edge.reversed()] -= new_flow
+                self.flow[self.edge_ids[a]] -= new_flow
 
             self.edge_updates += 2
 
@@ -84,28 +98,22 @@ class Dinic:
 
         return 0
 
-    def max_flow(self, s: Vertex, t: Vertex) -> int:
+    def max_flow(self, s: int, t: int) -> int:
         benchmark.set_bench_scope("dinic")
 
-        self.s = s
-        self.t = t
+        self.s = self.g.csr.index[s]
+        self.t = self.g.csr.index[t]
 
-        self.flow = defaultdict(int)
+        self.flow = [0] * self.g.csr.m
 
-        self.level = {}
-        self.ptr = {}
-        self.edge_adj = {}
+        self.level = []
+        self.ptr = []
 
         flow = 0
 
         while self.bfs():
-            self.edge_adj.clear()
-
-            for u in self.g.V:
-                if self.level.get(u, -1) != -1:
-                    self.edge_adj[u] = list(self.g.outgoing[u])
-
-            self.ptr = {u: 0 for u in self.edge_adj}
+            # The current arc of every vertex restarts at its first CSR arc
+            self.ptr = self.offsets[:-1]
 
             while True:
                 new_flow = self.dfs(self.s, INF)
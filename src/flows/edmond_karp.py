@@ -1,8 +1,8 @@
-from collections import defaultdict, deque
+from collections import deque
 from dataclasses import dataclass, field
 
 from src.flows.utils import finish_benchmark, benchmark_iteration
-from src.utils import Edge, Graph, Vertex
+from src.utils import Graph
 from src import benchmark
 
 INF = 1000000000
@@ -12,25 +12,42 @@ INF = 1000000000
 class MaxFlow:
     g: Graph
     n: int
-    s: Vertex
-    t: Vertex
+    s: int
+    t: int
 
-    flow: defaultdict[Edge, int] = field(default_factory=defaultdict)
+    flow: list[int] = field(default_factory=list)
+
+    # G.csr copied into lists, which are faster than NumPy for scalar access
+    offsets: list[int] = field(default_factory=list)
+    tails: list[int] = field(default_factory=list)
+    targets: list[int] = field(default_factory=list)
+    capacities: list[int] = field(default_factory=list)
+    edge_ids: list[int] = field(default_factory=list)
+    forward: list[bool] = field(default_factory=list)
 
     def __init__(self, G: Graph):
         self.g = G
         self.n = len(G.V)
 
-    def c_f(self, edge: Edge) -> int:
-        if edge.forward:
-            return edge.c - self.flow[edge]
+        csr = G.csr
+        self.offsets = csr.offsets.tolist()
+        self.targets = csr.targets.tolist()
+        self.tails = csr.tails.tolist()
+        self.capacities = csr.capacities.tolist()
+        self.edge_ids = csr.edge_ids.tolist()
+        self.forward = csr.forward.tolist()
+
+    def c_f(self, a: int) -> int:
+        f_e = self.flow[self.edge_ids[a]]
+        if self.forward[a]:
+            return self.capacities[a] - f_e
         else:
-            return self.flow[edge.reversed()]
+            return f_e
 
-    def bfs(self) -> tuple[int, dict[Vertex, Edge] | None]:
-        parent = dict[Vertex, Edge]()
+    def bfs(self) -> tuple[int, dict[int, int] | None]:
+        parent = dict[int, int]()
 
-        q = deque[tuple[Vertex, int]]()
+        q = deque[tuple[int, int]]()
         q.append((self.s, INF))
 
         visited = {self.s}
@@ -38,16 +55,16 @@ class MaxFlow:
         while q:
             u, flow = q.popleft()
 
-            for edge in self.g.outgoing[u]:
-                v = edge.v
+            for a in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[a]
 
                 if v in visited:
                     continue
 
-                cap = self.c_f(edge)
+                cap = self.c_f(a)
                 if cap > 0:
                     visited.add(v)
-                    parent[v] = edge
+                    parent[v] = a
                     new_flow = min(flow, cap)
                     if v == self.t:
                         return new_flow, parent
@@ -58,10 +75,10 @@ class MaxFlow:
     def max_flow(self, s: int, t: int) -> int:
         benchmark.set_bench_scope("edmond")
 
-        self.s = s
-        self.t = t
+        self.s = self.g.csr.index[s]
+        self.t = self.g.csr.index[t]
 
-        self.flow = defaultdict(int)
+        self.flow = [0] * self.g.csr.m
 
         flow = 0
 
@@ -76,14 +93,13 @@ class MaxFlow:
             cur = self.t
             edge_updates = 0
             while cur != self.s:
-                edge = parent[cur]
-                cur = edge.u
+                a = parent[cur]
+                cur = self.tails[a]
 
-                if edge.forward:
-                    self.flow[edge] = self.flow[edge] + new_flow
+                if self.forward[a]:
+                    self.flow[self.edge_ids[a]] += new_flow
                 else:
-                    edge = edge.reversed()
-                    self.flow[edge] = self.flow[edge] - new_flow
+                    self.flow[self.edge_ids[a]] -= new_flow
 
                 edge_updates += 2
             benchmark_iteration(edge_updates)
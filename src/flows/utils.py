@@ -2,9 +2,10 @@ from src import benchmark
 
 
 def benchmark_iteration(edge_updates: int):
-    benchmark.register_or_update_s(
-        "edge_updates", edge_updates, lambda x: x + edge_updates
-    )
+    if not benchmark.active:
+        return
+
+    benchmark.count_s("edge_updates", edge_updates)
     benchmark.register_or_update_s(
         "max_edge_updates",
         edge_updates,
@@ -15,7 +16,7 @@ def benchmark_iteration(edge_updates: int):
         edge_updates,
         lambda x: min(edge_updates, x),
     )
-    benchmark.register_or_update_s("iterations", 1, lambda x: x + 1)
+    benchmark.count_s("iterations")
 
 
 def finish_benchmark(flow: int):
@@ -0,0 +1,248 @@
+"""
+Link-cut trees (Sleator and Tarjan) over a rooted forest on the vertices
+range(n), used to push flow along paths of admissible edges.
+
+Every non-root vertex x stores the residual capacity and the weight of the
+edge to its parent. Trees are never re-rooted, so there is no evert and no
+reversal bit. All operations run in amortized O(log n) time.
+"""
+
+INF = float("inf")
+
+NIL = -1
+
+
+class LinkCutTree:
+    # Splay trees over preferred paths, ordered from the root down
+    left: list[int]
+    right: list[int]
+    parent: list[int]  # Splay parent, or path-parent for the root of a splay tree
+
+    # Per vertex values of the edge to its parent
+    value: list[float]
+    weight: list[int]
+
+    # Aggregates over splay subtrees
+    min_value: list[float]
+    sum_weight: list[int]
+    size: list[int]
+
+    add: list[float]  # Pending addition to value in the splay subtree
+
+    def __init__(self, n: int):
+        self.left = [NIL] * n
+        self.right = [NIL] * n
+        self.parent = [NIL] * n
+
+        self.value = [INF] * n
+        self.weight = [0] * n
+
+        self.min_value = [INF] * n
+        self.sum_weight = [0] * n
+        self.size = [1] * n
+
+        self.add = [0] * n
+
+    def _is_splay_root(self, x: int) -> bool:
+        p = self.parent[x]
+        return p == NIL or (self.left[p] != x and self.right[p] != x)
+
+    def _apply(self, x: int, delta: float):
+        self.value[x] += delta
+        self.min_value[x] += delta
+        self.add[x] += delta
+
+    def _push(self, x: int):
+        delta = self.add[x]
+        if delta != 0:
+            if self.left[x] != NIL:
+                self._apply(self.left[x], delta)
+            if self.right[x] != NIL:
+                self._apply(self.right[x], delta)
+            self.add[x] = 0
+
+    def _update(self, x: int):
+        m, s, k = self.value[x], self.weight[x], 1
+        for y in (self.left[x], self.right[x]):
+            if y != NIL:
+                m = min(m, self.min_value[y])
+                s += self.sum_weight[y]
+                k += self.size[y]
+        self.min_value[x], self.sum_weight[x], self.size[x] = m, s, k
+
+    def _rotate(self, x: int):
+        p = self.parent[x]
+        g = self.parent[p]
+
+        if not self._is_splay_root(p):
+            if self.left[g] == p:
+                self.left[g] = x
+            else:
+                self.right[g] = x
+        self.parent[x] = g
+
+        if self.left[p] == x:
+            self.left[p] = b = self.right[x]
+            self.right[x] = p
+        else:
+            self.right[p] = b = self.left[x]
+            self.left[x] = p
+
+        if b != NIL:
+            self.parent[b] = p
+        self.parent[p] = x
+
+        self._update(p)
+        self._update(x)
+
+    def _splay(self, x: int):
+        # Push pending additions down from the splay root to x
+        stack = [x]
+        while not self._is_splay_root(stack[-1]):
+            stack.append(self.parent[stack[-1]])
+        for y in reversed(stack):
+            self._push(y)
+
+        while not self._is_splay_root(x):
+            p = self.parent[x]
+            if not self._is_splay_root(p):
+                g = self.parent[p]
+                zig_zig = (self.left[g] == p) == (self.left[p] == x)
+                self._rotate(p if zig_zig else x)
+            self._rotate(x)
+
+    def _access(self, x: int):
+        """
+        Makes the path from the root of x's tree to x preferred and splays x,
+        so the splay tree of x holds exactly that path.
+        """
+        last = NIL
+        y = x
+        while y != NIL:
+            self._splay(y)
+            self.right[y] = last
+            self._update(y)
+            last = y
+            y = self.parent[y]
+        self._splay(x)
+
+    def find_root(self, x: int) -> int:
+        self._access(x)
+        while True:
+            self._push(x)
+            if self.left[x] == NIL:
+                break
+            x = self.left[x]
+        self._splay(x)
+        return x
+
+    def root_child(self, x: int) -> int:
+        """
+        Returns the child of the root on the path from x to its root, which
+        must not be x itself.
+        """
+        r = self.find_root(x)
+
+        # r is now the splay root of the path from r to x and has no left child
+        y = self.right[r]
+        assert y != NIL, "x is a root"
+        while True:
+            self._push(y)
+            if self.left[y] == NIL:
+                break
+            y = self.left[y]
+        self._splay(y)
+        return y
+
+    def link(self, x: int, y: int, value: int, weight: int):
+        """
+        Makes the tree root x a child of y through an edge with the given
+        residual capacity and weight.
+        """
+        self._access(x)
+        assert self.left[x] == NIL, "Only a tree root can be linked"
+
+        self.value[x] = value
+        self.weight[x] = weight
+        self._update(x)
+        self.parent[x] = y
+
+    def cut(self, x: int) -> float:
+        """
+        Removes the edge from x to its parent and returns its residual
+        capacity.
+        """
+        self._access(x)
+        value = self.value[x]
+
+        if self.left[x] != NIL:
+            self.parent[self.left[x]] = NIL
+            self.left[x] = NIL
+
+        self.value[x] = INF
+        self.weight[x] = 0
+        self._update(x)
+        return value
+
+    def get_value(self, x: int) -> float:
+        self._splay(x)
+        return self.value[x]
+
+    def path_min(self, x: int) -> tuple[float, int]:
+        """
+        Returns the minimum residual capacity on the path from x to its root
+        and the vertex closest to x whose parent edge attains it.
+        """
+        self._access(x)
+        m = self.min_value[x]
+
+        # The splay tree is ordered from the root down to x, so look for the
+        # rightmost vertex attaining the minimum
+        y = x
+        while True:
+            self._push(y)
+            r = self.right[y]
+            if r != NIL and self.min_value[r] == m:
+                y = r
+            elif self.value[y] == m:
+                break
+            else:
+                y = self.left[y]
+        self._splay(y)
+        return m, y
+
+    def path_add(self, x: int, delta: int):
+        """
+        Adds delta to the residual capacity of every edge from x to its root.
+        """
+        self._access(x)
+        self._apply(x, delta)
+
+    def path_length(self, x: int) -> int:
+        self._access(x)
+        return self.size[x] - 1
+
+    def path_weight(self, x: int) -> int:
+        self._access(x)
+        return self.sum_weight[x]
+
+    def path(self, x: int) -> list[int]:
+        """
+        Returns the vertices on the path from x to its root, in O(length) time.
+        """
+        self._access(x)
+        vertices: list[int] = []
+
+        stack: list[int] = []
+        y = x
+        while stack or y != NIL:
+            while y != NIL:
+                self._push(y)
+                stack.append(y)
+                y = self.left[y]
+            y = stack.pop()
+            vertices.append(y)
+            y = self.right[y]
+
+        vertices.reverse()
+        return vertices
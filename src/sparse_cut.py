@@ -1,23 +1,41 @@
 from dataclasses import dataclass
+import logging
 import sys
 import math
 import heapq
-from collections import defaultdict
+from collections import defaultdict, deque
 from typing import Callable, Self
 
-from .utils import Edge, Graph, Vertex
-from .weighted_push_relabel import WeightedPushRelabel
+import numpy as np
+import numpy.typing as npt
+
+from . import benchmark
+from .utils import Edge, Graph, Vertex, arc_edge_ids, arc_id_mask, arc_ids
+from .weighted_push_relabel import WarmStart, WeightedPushRelabel
+from .weights import Weights, constant_weights, edge_weights
+
+# Silent unless configured, e.g. with logging.basicConfig(level=logging.DEBUG).
+# INFO logs a summary of every call, DEBUG every level of the sweep.
+logger = logging.getLogger(__name__)
+
+# Computes the w_f-distance levels of the residual graph from a set of vertices,
+# see dijsktra
+type ShortestPaths = Callable[
+    [Graph, WeightedPushRelabel, list[int], list[int]], dict[int, set[int]]
+]
 
 
 def sparse_cut(
     I: tuple[Graph, list[int], dict[Vertex, int], dict[Vertex, int]],
     kappa: int,
-    F: set[Edge],
+    F: set[Edge] | npt.NDArray[np.bool_],
     H: dict[int, set[Edge]],
     c_6_5: int = 1,  # Constant from the paper
     phi: float = 0.2,  # Phi parameter from the paper
-    w_H: Callable[[Edge], int] = lambda e: 1,
-) -> tuple[dict[Edge, int], tuple[set[Vertex], set[Vertex], set[Edge]]]:
+    w_H: Weights | None = None,
+    shortest_paths: ShortestPaths | None = None,
+    warm_start: WarmStart | None = None,
+) -> tuple[list[int], tuple[set[Vertex], set[Vertex], set[Edge]]]:
     """
     Implementation of the SparseCut algorithm (Algorithm 2 from the paper).
 
@@ -28,15 +46,21 @@ def sparse_cut(
             sources: dictionary mapping vertices to source values
             sinks: dictionary mapping vertices to sink values
         kappa: Integer parameter
-        F: set of terminal edges
+        F: set of terminal edges, or their arc_id_mask, which can be shared by
+            every view of the same graph
         H: Expander hierarchy
         c_6_5: Constant from the paper
         phi: Phi parameter from the paper
-        w_H: Function to calculate weights for edges in the hierarchy
+        w_H: Weights of the edges in the hierarchy, see weights.Weights, 1
+            unless given. Both arcs of an edge get the weight of the edge
+        shortest_paths: Computes the distance levels, dijsktra by default.
+            dial is faster for the small integer weights used here.
+        warm_start: Flow and labels to start push-relabel from, e.g. those of
+            the parent call restricted to G. Gets the final flow and labels.
 
     Returns:
         tuple of (flow, cut) where:
-            flow: dictionary mapping edges to flow values
+            flow: list of flow values, indexed like G.E
             cut: tuple (S, Sbar) representing the cut
     """
     G, c, sources, sinks = I
@@ -48,7 +72,6 @@ def sparse_cut(
     # h = math.ceil((4 * (eta**4) * c_6_5 * (math.log(n) ** 7) * kappa) / (phi**2) * n)
     h = math.ceil(1 / phi)
     # h = math.ceil(n / 3)
-    print("Height h:", h)
 
     # Define c^κ = κ · c
     c_kappa = [kappa * cap for cap in c]
@@ -56,168 +79,205 @@ def sparse_cut(
     # Verify properties
     assert kappa <= n, "kappa should be less than or equal to n"  # Theorem 6.1
     assert kappa > 0, "kappa should be greater than 0"  # Theorem 6.1
-    print(1 / phi, 1 / (10 * math.log(n)))
     # assert 1 / phi <= n, (
     #     f"1/phi={1 / phi} should be less than or equal to n={n}"
     # )  # Theorem 6.1
     assert c_6_5 >= 1, "c_6_5 should be greater than or equal to 1"  # Theorem 6.5
 
-    # Define w_G(e)
-    def w_G(e: Edge) -> int:
-        if e in F:
-            return n
-        else:
-            return w_H(e)
+    # F by arc, an edge is only in F in the directions given
+    in_F = F if isinstance(F, np.ndarray) else arc_id_mask(G, F)
+
+    # Define w_G(e) for the forward arc of every edge, as push-relabel weighs
+    # both arcs of an edge by the edge
+    w_H_edges = edge_weights(G, w_H if w_H is not None else constant_weights(1))
+    w_G = np.where(in_F[2 * arc_edge_ids(G)[G.csr.edge_arcs]], n, w_H_edges)
 
-    print("Initialized", c_kappa, h)
+    logger.debug("Initialized h=%d, 1/phi=%s, c_kappa=%s", h, 1 / phi, c_kappa)
     # Run PushRelabel to get a flow f
-    instance = WeightedPushRelabel(G, c_kappa, sources, sinks, w_G, h)
+    instance = WeightedPushRelabel(
+        G, c_kappa, sources, sinks, w_G, h, warm_start=warm_start
+    )
     flow_value, f = instance.solve()
-    print("Flow value:", flow_value, sum(sources.values()))
+    logger.info("Flow value %d of %d", flow_value, sum(sources.values()))
 
     # If |f| = ||Δ||₁, return f
     if flow_value == sum(sources.values()):
         return f, (set(), set(), set())
 
     # else
-    # Let w_f be w_G extended to G_f
-    def w_f(e: Edge) -> int:
-        # , except set w_f(e->) = 0 for e ∈ D_H
-        if e in D_H and e.forward:
-            return 0
-        else:
-            return w_G(e)
+    # From here on vertices are indices into G.V and edges are arcs of G.csr
+    csr = G.csr
+    ids = arc_ids(G)
+
+    # Let w_f be w_G extended to G_f, except set w_f(e->) = 0 for e ∈ D_H
+    in_D_H = arc_id_mask(G, D_H)[ids] & csr.forward
+    w_f_arcs = np.where(
+        in_D_H, 0, np.where(in_F[ids], n, w_H_edges[csr.edge_ids])
+    ).tolist()
 
     # set S₀ = {s ∈ V : Δ_f(s) > 0}
-    S_0: list[Vertex] = [s for s in G.V if instance.excess(s) > 0]
-    print("excess", S_0)
+    S_0: list[int] = [s for s in range(csr.n) if instance.excess(s) > 0]
+    logger.debug("Excess at %s", S_0)
 
-    print("Calculating distance levels")
-    distance_level_collections = dijsktra(G, instance, S_0, w_f)
-    print("Distance levels:", distance_level_collections)
+    distance_levels = (shortest_paths or dijsktra)(G, instance, S_0, w_f_arcs)
+    logger.debug("Distance levels %s", distance_levels)
 
     # Calculate vol_F for each vertex
-    vol_F: dict[Vertex, int] = defaultdict(int)
-    for edge in set(e for edges in G.outgoing.values() for e in edges):
-        if edge in F and instance.c_f(edge) > 0:
-            vol_F[edge.start()] += 1
-            vol_F[edge.end()] += 1
-
-    best_global_cut = None
-    for distance_levels in distance_level_collections:
-        max_level = max(distance_levels.keys())
-        assert max_level >= 0, "Max level should be non-negative"
-
-        best_local_cut = None
-
-        S_leq_i: set[Vertex] = set()  # S_≤i
-        for i in sorted(list(distance_levels.keys())):
-            # Add vertices from level i to S_≤i
-            S_leq_i.update(distance_levels[i])
-            S_leq_i_complement = set(G.V) - S_leq_i
-
-            # Calculate c^κ_f(E_{G_f}(S_≤i, S̄_≤i))
-            cut_capacity = 0
-            boundary: set[Edge] = set()
-            reverse_boundary: set[Edge] = set()
-            for u in S_leq_i:
-                for edge in G.incident[u]:
-                    if instance.c_f(edge) <= 0:
-                        continue
-
-                    if edge.end() in S_leq_i_complement:
-                        cut_capacity += edge.c
-                        boundary.add(edge)
-
-                    if edge.start() in S_leq_i_complement:
-                        reverse_boundary.add(edge)
-
-            # Calculate vol_F(S_≤i) and vol_F(S̄_≤i)
-            vol_S = sum(vol_F[v] for v in S_leq_i)
-            vol_S_complement = sum(vol_F[v] for v in S_leq_i_complement)
-
-            # Calculate the minimum of vol_F(S_≤i) and vol_F(S̄_≤i)
-            min_vol = min(vol_S, vol_S_complement)
-
-            # Calculate the value to be minimized
-            value = cut_capacity - min_vol
-            print(f"\n== Level {i} ==")
-            if len(boundary) == 0:
-                print("Boundary size is 0, skipping")
-                continue
-
-            local_cut = Cut(
-                S_leq_i.copy(),
-                S_leq_i_complement.copy(),
-                boundary | reverse_boundary,
-                value,
-            )
-            local_cut.print()
-            print(
-                f"cut_cap - min(vol_S, vol_S_complement): {cut_capacity} - min({vol_S}, {vol_S_complement})"
-            )
+    vol_F = [0] * csr.n
+    for a, arc_in_F in enumerate(in_F[ids].tolist()):
+        if arc_in_F and instance.c_f(a) > 0:
+            vol_F[instance.tails[a]] += 1
+            vol_F[instance.targets[a]] += 1
+    total_vol_F = sum(vol_F)
+
+    max_level = max(distance_levels.keys())
+    assert max_level >= 0, "Max level should be non-negative"
+
+    # Sweep over the levels, moving the vertices of level i into S_≤i and only
+    # updating the cut along their incident edges
+    in_S = [False] * csr.n
+    size_S = 0
+    vol_S = 0  # vol_F(S_≤i)
+    cut_capacity = 0  # c^κ_f(E_{G_f}(S_≤i, S̄_≤i))
+    boundary: set[int] = set()  # Residual arcs from S_≤i to S̄_≤i
+    reverse_boundary: set[int] = set()  # Residual arcs from S̄_≤i to S_≤i
+
+    best_level = None
+    best_value = 0
+    for i in sorted(distance_levels.keys()):
+        for u in distance_levels[i]:
+            in_S[u] = True
+            size_S += 1
+            vol_S += vol_F[u]
+
+            # The incident edges of u are its outgoing arcs and their reverses
+            for a in range(instance.offsets[u], instance.offsets[u + 1]):
+                v = instance.targets[a]
+                if instance.c_f(a) > 0:
+                    if in_S[v]:
+                        reverse_boundary.discard(a)
+                    else:
+                        boundary.add(a)
+                        cut_capacity += instance.capacities[a]
+
+                e = instance.reverse[a]
+                if instance.c_f(e) > 0:
+                    if e in boundary:
+                        boundary.remove(e)
+                        cut_capacity -= instance.capacities[e]
+                    elif not in_S[v]:
+                        reverse_boundary.add(e)
+
+        vol_S_complement = total_vol_F - vol_S
+
+        # Calculate the minimum of vol_F(S_≤i) and vol_F(S̄_≤i)
+        min_vol = min(vol_S, vol_S_complement)
+
+        # Calculate the value to be minimized
+        value = cut_capacity - min_vol
+        if len(boundary) == 0:
+            logger.debug("Level %d: boundary size is 0, skipping", i)
+            continue
+
+        # For interest, calculate the Cheeger constant
+        if min_vol == 0:
+            cheeger_constant = float("inf")
+        else:
+            cheeger_constant = len(boundary) / min_vol
 
-            # For interest, calculate the Cheeger constant
-            if min_vol == 0:
-                cheeger_constant = float("inf")
-            else:
-                cheeger_constant = len(boundary) / min_vol
-            print("Boundary size:", len(boundary))
-            print("Cheeger constant:", cheeger_constant)
-
-            # For interest, calculate the sparsity of the cut
-            # Calculated based on https://home.ttic.edu/~yury/courses/geometry/notes/sparsest-cut.pdf
-            smallest_vertex_set = min(len(S_leq_i), len(S_leq_i_complement))
-            if smallest_vertex_set == 0:
-                sparsity = float("inf")
-            else:
-                sparsity = len(boundary) / smallest_vertex_set
-            print("Sparsity:", sparsity)
-            print(
-                "min{|E(S, S)|, |E(S, S)|} < ϕ · min{vol(S), vol(S̄)}",
-                f" = min({len(boundary)}, {len(reverse_boundary)}) < {phi} · min({vol_S}, {vol_S_complement})",
-                f" = {min(len(boundary), len(reverse_boundary))} < {phi * min(vol_S, vol_S_complement)}",
-                f" = {min(len(boundary), len(reverse_boundary)) < phi * min(vol_S, vol_S_complement)}",
+        # For interest, calculate the sparsity of the cut
+        # Calculated based on https://home.ttic.edu/~yury/courses/geometry/notes/sparsest-cut.pdf
+        smallest_vertex_set = min(size_S, csr.n - size_S)
+        if smallest_vertex_set == 0:
+            sparsity = float("inf")
+        else:
+            sparsity = len(boundary) / smallest_vertex_set
+
+        # min{|E(S, S̄)|, |E(S̄, S)|} < ϕ · min{vol(S), vol(S̄)}
+        phi_sparse = min(len(boundary), len(reverse_boundary)) < phi * min_vol
+
+        logger.debug(
+            "Level %d: value %d = %d - min(%d, %d), boundary %d | %d, "
+            "Cheeger constant %s, sparsity %s, ϕ-sparse %s",
+            i,
+            value,
+            cut_capacity,
+            vol_S,
+            vol_S_complement,
+            len(boundary),
+            len(reverse_boundary),
+            cheeger_constant,
+            sparsity,
+            phi_sparse,
+        )
+        if benchmark.active:
+            benchmark.append(
+                "sparse_cut.levels",
+                {
+                    "level": i,
+                    "value": value,
+                    "capacity": cut_capacity,
+                    "vol_S": vol_S,
+                    "vol_S_complement": vol_S_complement,
+                    "boundary": len(boundary),
+                    "reverse_boundary": len(reverse_boundary),
+                    "cheeger_constant": cheeger_constant,
+                    "sparsity": sparsity,
+                    "phi_sparse": phi_sparse,
+                },
             )
 
-            if best_local_cut is None:
-                best_local_cut = local_cut
-            else:
-                print("Updating local best cut")
-                best_local_cut.update(local_cut)
-
-        if best_global_cut is None and best_local_cut is not None:
-            best_global_cut = best_local_cut
-        elif best_global_cut is not None and best_local_cut is not None:
-            print("Updating global best cut")
-            best_global_cut.update(best_local_cut)
+        if best_level is None or value < best_value:
+            best_level, best_value = i, value
 
-    if best_global_cut is None:
+    if best_level is None:
+        logger.info("No cut found")
         return f, (set(), set(), set())
 
-    return f, best_global_cut.get_tuple()
+    logger.info("Best cut at level %d with value %d", best_level, best_value)
+
+    best_cut = Cut.from_levels(instance, distance_levels, best_level, best_value)
+    S, S_complement, arcs = best_cut.get_tuple()
+    return f, (
+        {G.V[x] for x in S},
+        {G.V[x] for x in S_complement},
+        {G.edge(a) for a in arcs},
+    )
 
 
 @dataclass
 class Cut:
-    S_leq_i: set[Vertex]
-    S_leq_i_complement: set[Vertex]
-    edges: set[Edge]
+    S_leq_i: set[int]
+    S_leq_i_complement: set[int]
+    edges: set[int]
     value: int
 
-    def update(self, other: Self):
-        if other.value < self.value:
-            print("Best cut updated:", other.value)
+    @classmethod
+    def from_levels(
+        cls,
+        instance: WeightedPushRelabel,
+        distance_levels: dict[int, set[int]],
+        i: int,
+        value: int,
+    ) -> Self:
+        """
+        Builds the cut between S_≤i and its complement, with the residual arcs
+        crossing it in either direction.
+        """
+        S_leq_i = {v for level, S in distance_levels.items() if level <= i for v in S}
+        S_leq_i_complement = set(range(len(instance.offsets) - 1)) - S_leq_i
+
+        edges: set[int] = set()
+        for u in S_leq_i:
+            for a in range(instance.offsets[u], instance.offsets[u + 1]):
+                if instance.targets[a] in S_leq_i:
+                    continue
 
-            self.S_leq_i = other.S_leq_i
-            self.S_leq_i_complement = other.S_leq_i_complement
-            self.edges = other.edges
-            self.value = other.value
+                for e in (a, instance.reverse[a]):
+                    if instance.c_f(e) > 0:
+                        edges.add(e)
 
-    def print(self):
-        print("Cut:", self.S_leq_i, self.S_leq_i_complement)
-        print("value:", self.value)
-        print("edges:", self.edges)
+        return cls(S_leq_i, S_leq_i_complement, edges, value)
 
     def get_tuple(self):
         return (
@@ -230,45 +290,131 @@ class Cut:
 def dijsktra(
     G: Graph,
     instance: WeightedPushRelabel,
-    S_0: list[Vertex],
-    w_f: Callable[[Edge], int],
-) -> list[dict[int, set[Vertex]]]:
-    level_collections: list[dict[int, set[Vertex]]] = []
-
+    S_0: list[int],
+    w_f: list[int],
+) -> dict[int, set[int]]:
+    """
+    Computes the w_f-distance levels of the residual graph from the set S_0,
+    in a single pass which starts with every vertex of S_0 at distance 0.
+    Vertices are indices into G.V and w_f is indexed by the arcs of G.csr.
+    Unreachable vertices end up in the level sys.maxsize.
+    """
+    distances = [sys.maxsize] * G.csr.n
     for start in S_0:
-        # Compute w_f-distance levels in the residual graph
-        # We'll use Dijkstra's algorithm to compute distances
-        # Initialize distances
-        distances = {v: sys.maxsize for v in instance.G.V}
         distances[start] = 0
 
-        # Compute distances using Dijkstra's algorithm
-        queue = [(0, start)]
-        heapq.heapify(queue)
-        visited: set[Vertex] = set()
+    queue = [(0, start) for start in S_0]
+    heapq.heapify(queue)
+    visited = [False] * G.csr.n
+
+    while queue:
+        dist, u = heapq.heappop(queue)
+        if visited[u]:
+            continue
+
+        visited[u] = True
+        for a in range(instance.offsets[u], instance.offsets[u + 1]):
+            v = instance.targets[a]
+            if visited[v] or instance.c_f(a) == 0:
+                continue
+
+            if dist + w_f[a] < distances[v]:
+                distances[v] = dist + w_f[a]
+                heapq.heappush(queue, (distances[v], v))
 
-        print("Distances initialized:", distances)
-        while queue:
-            dist, u = heapq.heappop(queue)
-            if u in visited:
+    return levels_from_distances(distances)
+
+
+def dial(
+    G: Graph,
+    instance: WeightedPushRelabel,
+    S_0: list[int],
+    w_f: list[int],
+) -> dict[int, set[int]]:
+    """
+    Same as dijsktra, but with Dial's bucket queue instead of a heap, which
+    takes O(m + D) time for the non-negative integer weights w_f, where D is
+    the largest finite distance. Falls back to a 0-1 BFS if no weight is
+    larger than 1.
+    """
+    max_w = max(w_f, default=0)
+    if max_w <= 1:
+        return zero_one_bfs(G, instance, S_0, w_f)
+
+    distances = [sys.maxsize] * G.csr.n
+    visited = [False] * G.csr.n
+
+    # Queued distances are always in [d, d + max_w], so the buckets can wrap
+    buckets: list[list[int]] = [[] for _ in range(max_w + 1)]
+    for start in S_0:
+        distances[start] = 0
+        buckets[0].append(start)
+    queued = len(S_0)
+
+    d = 0
+    while queued > 0:
+        bucket = buckets[d % (max_w + 1)]
+        while bucket:
+            u = bucket.pop()
+            queued -= 1
+            if visited[u] or distances[u] != d:
                 continue
 
-            visited.add(u)
-            for edge in G.outgoing[u]:
-                v = edge.end()
-                if v in visited or instance.c_f(edge) == 0:
+            visited[u] = True
+            for a in range(instance.offsets[u], instance.offsets[u + 1]):
+                v = instance.targets[a]
+                if visited[v] or instance.c_f(a) == 0:
                     continue
 
-                weight = w_f(edge)
+                if d + w_f[a] < distances[v]:
+                    distances[v] = d + w_f[a]
+                    buckets[distances[v] % (max_w + 1)].append(v)
+                    queued += 1
+        d += 1
+
+    return levels_from_distances(distances)
+
+
+def zero_one_bfs(
+    G: Graph,
+    instance: WeightedPushRelabel,
+    S_0: list[int],
+    w_f: list[int],
+) -> dict[int, set[int]]:
+    """
+    Same as dijsktra for weights w_f that are all 0 or 1, in O(n + m) time.
+    """
+    distances = [sys.maxsize] * G.csr.n
+    for start in S_0:
+        distances[start] = 0
+
+    queue = deque(S_0)
+    visited = [False] * G.csr.n
+
+    while queue:
+        u = queue.popleft()
+        if visited[u]:
+            continue
+
+        visited[u] = True
+        for a in range(instance.offsets[u], instance.offsets[u + 1]):
+            v = instance.targets[a]
+            if visited[v] or instance.c_f(a) == 0:
+                continue
+
+            if distances[u] + w_f[a] < distances[v]:
+                distances[v] = distances[u] + w_f[a]
+                if w_f[a] == 0:
+                    queue.appendleft(v)
+                else:
+                    queue.append(v)
 
-                if dist + weight < distances[v]:
-                    distances[v] = dist + weight
-                    heapq.heappush(queue, (distances[v], v))
+    return levels_from_distances(distances)
 
-        levels: dict[int, set[Vertex]] = defaultdict(set)
-        for v, dist in distances.items():
-            levels[dist].add(v)
 
-        level_collections.append(levels)
+def levels_from_distances(distances: list[int]) -> dict[int, set[int]]:
+    levels: dict[int, set[int]] = defaultdict(set)
+    for v, dist in enumerate(distances):
+        levels[dist].add(v)
 
-    return level_collections
+    return levels
@@ -1,7 +1,15 @@
-from collections import defaultdict
+from collections.abc import Iterable
 from dataclasses import dataclass, field
+from functools import cached_property
+import heapq
+from itertools import chain
+import io
+import os
 import random
-from typing import Self, override
+from typing import BinaryIO, Self, override
+
+import numpy as np
+import numpy.typing as npt
 
 from src import benchmark
 
@@ -46,27 +54,31 @@ class EdgeSet:
     inner: set[Edge] = field(default_factory=set)
 
     def add(self, edge: Edge):
-        benchmark.register_or_update_s("edge_set.add", 1, lambda x: x + 1)
+        benchmark.count_s("edge_set.add")
         self.inner.add(edge)
 
     def __or__(self, other: Self):
-        benchmark.register_or_update_s("edge_set.or", 1, lambda x: x + 1)
+        benchmark.count_s("edge_set.or")
         return EdgeSet(self.inner | other.inner)
 
     def __ror__(self, other: Self):
-        benchmark.register_or_update_s("edge_set.ror", 1, lambda x: x + 1)
+        benchmark.count_s("edge_set.ror")
         return EdgeSet(other.inner | self.inner)
 
     def __contains__(self, edge: Edge) -> bool:
-        benchmark.register_or_update_s("edge_set.contains", 1, lambda x: x + 1)
+        benchmark.count_s("edge_set.contains")
         return edge in self.inner
 
     def __iter__(self):
-        benchmark.register_or_update_s("edge_set.iter", 1, lambda x: x + 1)
+        benchmark.count_s("edge_set.iter")
+
+        if not benchmark.active:
+            yield from self.inner
+            return
 
         # Create a generator that tracks each item access
         for edge in self.inner:
-            benchmark.register_or_update_s("edge_set.next", 1, lambda x: x + 1)
+            benchmark.count_s("edge_set.next")
             yield edge
 
 
@@ -75,28 +87,117 @@ class EdgeDict:
     inner: dict[Vertex, EdgeSet] = field(default_factory=dict)
 
     def __getitem__(self, vertex: Vertex) -> EdgeSet:
-        benchmark.register_or_update_s("edge_dict.get", 1, lambda x: x + 1)
+        benchmark.count_s("edge_dict.get")
         return self.inner.get(vertex, EdgeSet(set()))
 
     def __setitem__(self, vertex: Vertex, edges: EdgeSet):
-        benchmark.register_or_update_s("edge_dict.set", 1, lambda x: x + 1)
+        benchmark.count_s("edge_dict.set")
         self.inner[vertex] = edges
 
     def __contains__(self, vertex: Vertex) -> bool:
-        benchmark.register_or_update_s("edge_dict.contains", 1, lambda x: x + 1)
+        benchmark.count_s("edge_dict.contains")
         return vertex in self.inner
 
     def values(self) -> list[EdgeSet]:
-        benchmark.register_or_update_s("edge_dict.values", 1, lambda x: x + 1)
+        benchmark.count_s("edge_dict.values")
         return list(self.inner.values())
 
     def all(self) -> EdgeSet:
-        benchmark.register_or_update_s("edge_dict.all", 1, lambda x: x + 1)
+        benchmark.count_s("edge_dict.all")
         return EdgeSet(
             set(edge for edges in self.inner.values() for edge in edges.inner)
         )
 
 
+@dataclass
+class CSR:
+    """
+    Compressed sparse row representation of the residual graph.
+
+    Every input edge `G.E[i]` gives two arcs: a forward arc u -> v and a
+    backward arc v -> u, which are each other's `reverse`. Arcs are grouped by
+    their tail, so the arcs leaving the vertex with index x are
+    `offsets[x]..offsets[x + 1]`. Vertices are addressed by their index in
+    `G.V` and edges by their index in `G.E`.
+    """
+
+    n: int
+    m: int
+
+    vertices: npt.NDArray[np.int64]  # Vertex index -> Vertex
+    index: dict[Vertex, int]  # Vertex -> vertex index
+
+    offsets: npt.NDArray[np.int64]  # n + 1
+    tails: npt.NDArray[np.int64]  # 2m
+    targets: npt.NDArray[np.int64]  # 2m
+    capacities: npt.NDArray[np.int64]  # 2m, capacity of the underlying edge
+    reverse: npt.NDArray[np.int64]  # 2m
+    edge_ids: npt.NDArray[np.int64]  # 2m, index into G.E
+    forward: npt.NDArray[np.bool_]  # 2m
+
+    edge_arcs: npt.NDArray[np.int64]  # m, forward arc of each edge
+
+    def out_arcs(self, x: int) -> range:
+        return range(self.offsets[x], self.offsets[x + 1])
+
+    def degrees(self) -> npt.NDArray[np.int64]:
+        return np.diff(self.offsets)
+
+
+def make_csr(V: list[Vertex], E: list[tuple[Vertex, Vertex]], c: list[int]) -> CSR:
+    n, m = len(V), len(E)
+    index = {v: i for i, v in enumerate(V)}
+    vertices = np.array(V, dtype=np.int64)
+
+    ends = np.fromiter(chain.from_iterable(E), dtype=np.int64, count=2 * m)
+    ends = ends.reshape(m, 2)
+    if np.array_equal(vertices, np.arange(n)):
+        missing = (ends < 0) | (ends >= n)
+    else:
+        # The ends are not vertex indices already, look them up by value. The
+        # last of equal vertices wins, like in index
+        by_vertex = np.argsort(vertices, kind="stable")
+        found = np.searchsorted(vertices, ends, side="right", sorter=by_vertex) - 1
+        missing = found == -1
+        found[missing] = 0
+        ends, vertex_ends = by_vertex[found], ends
+        missing |= vertices[ends] != vertex_ends
+    if missing.any():
+        raise KeyError(E[int(np.flatnonzero(missing.any(axis=1))[0])])
+
+    # Edges without a capacity (e.g. `Graph(V, E, [])`) get capacity 0
+    caps = np.zeros(m, dtype=np.int64)
+    k = min(m, len(c))
+    caps[:k] = c[:k]
+
+    # Unsorted arc 2i is the forward arc of edge i and 2i + 1 its backward arc
+    unsorted_tails = ends.ravel()
+    unsorted_targets = ends[:, ::-1].ravel()
+
+    order = np.argsort(unsorted_tails, kind="stable")
+    position = np.empty(2 * m, dtype=np.int64)
+    position[order] = np.arange(2 * m, dtype=np.int64)
+
+    edge_ids = order >> 1
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(unsorted_tails, minlength=n), out=offsets[1:])
+
+    return CSR(
+        n=n,
+        m=m,
+        vertices=vertices,
+        index=index,
+        offsets=offsets,
+        tails=unsorted_tails[order],
+        targets=unsorted_targets[order],
+        capacities=caps[edge_ids],
+        reverse=position[order ^ 1],
+        edge_ids=edge_ids,
+        forward=(order & 1) == 0,
+        edge_arcs=position[0::2],
+    )
+
+
 @dataclass
 class Graph:
     V: list[Vertex]
@@ -104,30 +205,64 @@ class Graph:
     c: list[int]
 
     # Our state
-    outgoing: EdgeDict = field(default_factory=EdgeDict)
-    incoming: EdgeDict = field(default_factory=EdgeDict)
-    incident: EdgeDict = field(default_factory=EdgeDict)
+    csr: CSR = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         for u, v in self.E:
             if u == v:
                 raise ValueError(f"Self-loop detected: {u} -> {v}")
 
-        self.outgoing, self.incoming, self.incident = make_outgoing_incoming(
-            self, self.c
-        )
+        self.csr = make_csr(self.V, self.E, self.c)
+
+    # The Edge based views are only built when something asks for them, the
+    # algorithms themselves run on the arcs of `csr`.
+    @cached_property
+    def _edge_views(self) -> tuple[EdgeDict, EdgeDict, EdgeDict]:
+        return make_outgoing_incoming(self, self.c)
+
+    @property
+    def outgoing(self) -> EdgeDict:
+        return self._edge_views[0]
+
+    @property
+    def incoming(self) -> EdgeDict:
+        return self._edge_views[1]
+
+    @property
+    def incident(self) -> EdgeDict:
+        return self._edge_views[2]
+
+    def edge(self, a: int) -> Edge:
+        """
+        Returns the arc a of `csr` as an Edge.
+        """
+        csr = self.csr
+        i = int(csr.edge_ids[a])
+        u, v = self.E[i]
+        e = Edge(id=i + 1, u=u, v=v, c=int(csr.capacities[a]), forward=True)
+        return e if csr.forward[a] else e.reversed()
+
+    def arc(self, e: Edge) -> int:
+        """
+        Returns the arc of `csr` corresponding to the Edge e.
+        """
+        a = int(self.csr.edge_arcs[abs(e.id) - 1])
+        return a if e.forward else int(self.csr.reverse[a])
 
     def volume(self, v: int) -> int:
         """
         Returns the volume of the vertex v.
         """
-        return sum(1 for edge in self.incident[v] if edge.forward)
+        x = self.csr.index[v]
+        return int(self.csr.offsets[x + 1] - self.csr.offsets[x])
 
     def volume_c(self, v: int) -> int:
         """
         Returns the volume of the vertex v.
         """
-        return sum(edge.c for edge in self.incident[v] if edge.forward)
+        csr = self.csr
+        x = csr.index[v]
+        return int(csr.capacities[csr.offsets[x] : csr.offsets[x + 1]].sum())
 
     def all_edges(self) -> EdgeSet:
         """
@@ -144,15 +279,174 @@ class Graph:
         )
 
 
+class InducedSubgraph(Graph):
+    """
+    View of the subgraph of a Graph induced by a set of vertices.
+
+    Vertices are masked in the CSR of the root Graph, and the CSR of the view
+    is sliced out of it with NumPy, keeping the order of the vertices and arcs.
+    The edges keep their ids and capacities in the root, so they are equal to
+    the Edges of the root. E and c are indexed by the edges of the view, and
+    only built when something asks for them.
+    """
+
+    root: Graph
+    vertex_ids: npt.NDArray[np.int64]  # Vertex index -> vertex index in root
+    edge_ids: npt.NDArray[np.int64]  # Edge index -> index into root.E
+
+    # Graph.__init__ is not run, the root was already checked and the CSR of
+    # the view is sliced out of its CSR instead of built from E and c
+    def __init__(self, parent: Graph, vertices: Iterable[Vertex]):
+        index = parent.csr.index
+        local = np.array([index[v] for v in vertices], dtype=np.int64)
+        if isinstance(parent, InducedSubgraph):
+            self.root = parent.root
+            local = parent.vertex_ids[local]
+        else:
+            self.root = parent
+
+        mask = np.zeros(self.root.csr.n, dtype=np.bool_)
+        mask[local] = True
+        self.vertex_ids = np.flatnonzero(mask)
+        self.csr, self.edge_ids = induced_csr(self.root.csr, mask)
+        self.V = self.csr.vertices.tolist()
+
+    @cached_property
+    def E(self) -> list[tuple[Vertex, Vertex]]:
+        E = self.root.E
+        return [E[i] for i in self.edge_ids.tolist()]
+
+    @cached_property
+    def c(self) -> list[int]:
+        csr = self.csr
+        return csr.capacities[csr.edge_arcs].tolist()
+
+    @cached_property
+    def _edge_views(self) -> tuple[EdgeDict, EdgeDict, EdgeDict]:
+        return make_outgoing_incoming(self, self.c, self.edge_ids.tolist())
+
+    @override
+    def edge(self, a: int) -> Edge:
+        csr = self.csr
+        i = int(self.edge_ids[csr.edge_ids[a]])
+        u, v = self.root.E[i]
+        e = Edge(id=i + 1, u=u, v=v, c=int(csr.capacities[a]), forward=True)
+        return e if csr.forward[a] else e.reversed()
+
+    @override
+    def arc(self, e: Edge) -> int:
+        i = int(np.searchsorted(self.edge_ids, abs(e.id) - 1))
+        if i == len(self.edge_ids) or self.edge_ids[i] != abs(e.id) - 1:
+            raise KeyError(e)
+        a = int(self.csr.edge_arcs[i])
+        return a if e.forward else int(self.csr.reverse[a])
+
+    def indices_in(
+        self, parent: Graph
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+        """
+        Returns the vertex and edge indices in parent of the vertices and
+        edges of this view, where parent is the root or a view containing it.
+        """
+        if not isinstance(parent, InducedSubgraph):
+            return self.vertex_ids, self.edge_ids
+
+        return (
+            np.searchsorted(parent.vertex_ids, self.vertex_ids),
+            np.searchsorted(parent.edge_ids, self.edge_ids),
+        )
+
+
+def induced_csr(
+    csr: CSR, mask: npt.NDArray[np.bool_]
+) -> tuple[CSR, npt.NDArray[np.int64]]:
+    """
+    Returns the CSR of the subgraph induced by the vertex indices in mask, and
+    the index in csr of each of its edges.
+    """
+    n = int(mask.sum())
+    local = np.cumsum(mask) - 1  # Vertex index in csr -> vertex index
+
+    kept_arcs = mask[csr.tails] & mask[csr.targets]
+    kept_edges = kept_arcs[csr.edge_arcs]
+    arc_index = np.cumsum(kept_arcs) - 1  # Arc of csr -> arc
+    edge_index = np.cumsum(kept_edges) - 1  # Edge index in csr -> edge index
+
+    arcs = np.flatnonzero(kept_arcs)
+    edges = np.flatnonzero(kept_edges)
+    tails = local[csr.tails[arcs]]
+    vertices = csr.vertices[mask]
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=offsets[1:])
+
+    return (
+        CSR(
+            n=n,
+            m=len(edges),
+            vertices=vertices,
+            index={v: i for i, v in enumerate(vertices.tolist())},
+            offsets=offsets,
+            tails=tails,
+            targets=local[csr.targets[arcs]],
+            capacities=csr.capacities[arcs],
+            reverse=arc_index[csr.reverse[arcs]],
+            edge_ids=edge_index[csr.edge_ids[arcs]],
+            forward=csr.forward[arcs],
+            edge_arcs=arc_index[csr.edge_arcs[edges]],
+        ),
+        edges,
+    )
+
+
+def arc_id_mask(G: Graph, edges: Iterable[Edge]) -> npt.NDArray[np.bool_]:
+    """
+    Returns a bool array over the arcs of G, or of its root if G is an
+    InducedSubgraph, which is True for the given Edges. Like the unsorted arcs
+    of a CSR, entry 2i is the forward arc of edge i and 2i + 1 its backward
+    arc, see arc_id.
+    """
+    root = G.root if isinstance(G, InducedSubgraph) else G
+    mask = np.zeros(2 * root.csr.m, dtype=np.bool_)
+    mask[[arc_id(e) for e in edges]] = True
+    return mask
+
+
+def arc_id(e: Edge) -> int:
+    """
+    Returns the entry of e in an arc_id_mask.
+    """
+    return 2 * (abs(e.id) - 1) + (not e.forward)
+
+
+def arc_edge_ids(G: Graph) -> npt.NDArray[np.int64]:
+    """
+    Returns abs(G.edge(a).id) - 1 for every arc a of G.csr.
+    """
+    if isinstance(G, InducedSubgraph):
+        return G.edge_ids[G.csr.edge_ids]
+    return G.csr.edge_ids
+
+
+def arc_ids(G: Graph) -> npt.NDArray[np.int64]:
+    """
+    Returns arc_id(G.edge(a)) for every arc a of G.csr, so an arc_id_mask can
+    be looked up by arc.
+    """
+    return 2 * arc_edge_ids(G) + ~G.csr.forward
+
+
 def make_outgoing_incoming(
-    G: Graph, c: list[int]
+    G: Graph, c: list[int], ids: list[int] | None = None
 ) -> tuple[EdgeDict, EdgeDict, EdgeDict]:
     # This function is a little messy, but it's to ensure we don't fill benchmarks
     outgoing = EdgeDict({u: EdgeSet() for u in G.V})
     incoming = EdgeDict({u: EdgeSet() for u in G.V})
 
     for i, ((u, v), cap) in enumerate(zip(G.E, c)):
-        e = Edge(id=i + 1, u=u, v=v, c=cap, forward=True)
+        # Edges are numbered from 1, views keep the numbers of their root
+        edge_id = (i if ids is None else ids[i]) + 1
+        e = Edge(id=edge_id, u=u, v=v, c=cap, forward=True)
         e_rev = e.reversed()
 
         outgoing.inner[u].inner.add(e)
@@ -167,101 +461,210 @@ def make_outgoing_incoming(
     return outgoing, incoming, EdgeDict(incident)
 
 
-def topological_sort(G: Graph) -> list[Vertex]:
-    adj: dict[Vertex, set[Vertex]] = defaultdict(set)
-    for u, v in G.E:
-        adj[u].add(v)
-
-    visited: set[Vertex] = set()
-    sorted_vertices: list[Vertex] = []
+class MinIndexedSet:
+    """
+    A set of integers in range(n) with O(1) membership, O(log n) add and
+    discard, and amortized O(log n) access to its smallest element.
+    """
 
-    def dfs(v: Vertex):
-        visited.add(v)
+    heap: list[int]  # Every item, and items discarded since they were pushed
+    present: list[bool]
+    size: int
 
-        for w in adj[v]:
-            if w not in visited:
-                dfs(w)
+    def __init__(self, n: int, items: Iterable[int] = ()):
+        self.heap = []
+        self.present = [False] * n
+        self.size = 0
+        for x in items:
+            self.add(x)
 
-        sorted_vertices.append(v)
+    def __len__(self) -> int:
+        return self.size
 
-    for v in G.V:
-        if v not in visited:
-            dfs(v)
+    def __contains__(self, x: int) -> bool:
+        return self.present[x]
 
-    return sorted_vertices[::-1]
+    def add(self, x: int):
+        if not self.present[x]:
+            self.present[x] = True
+            self.size += 1
+            heapq.heappush(self.heap, x)
 
+    def discard(self, x: int):
+        # Stays in the heap until it reaches the top
+        if self.present[x]:
+            self.present[x] = False
+            self.size -= 1
 
-def topological_sort_with_backwards_edges(
-    G: Graph,
-) -> tuple[list[Vertex], set[tuple[int, int]]]:
-    no_cycle_g, backwards_edges = remove_cycles(G)
-    order = topological_sort(no_cycle_g)
-
-    return (order, backwards_edges)
+    def min(self) -> int:
+        """
+        Returns the smallest item of the set.
+        """
+        heap = self.heap
+        while not self.present[heap[0]]:
+            _ = heapq.heappop(heap)
+        return heap[0]
 
 
-def remove_cycles(
-    G: Graph,
-) -> tuple[Graph, set[tuple[int, int]]]:
+def successors(G: Graph) -> tuple[list[int], list[int]]:
     """
-    Create a new graph without cycles
+    Returns the offsets and targets of the adjacency lists of G by vertex
+    index, following only the edges forward. Parallel edges are merged. The
+    successors of every vertex are in the order in which a set of their
+    Vertex, filled in the order of G.E, iterates them, like the set-based
+    adjacency of the old recursive searches. For small integers that is
+    increasing order, but not in general.
     """
-    adj: dict[Vertex, set[Vertex]] = defaultdict(set)
+    index = G.csr.index
+    adjacent: list[set[Vertex]] = [set() for _ in range(G.csr.n)]
     for u, v in G.E:
-        adj[u].add(v)
+        adjacent[index[u]].add(v)
 
-    edges_to_remove: set[tuple[int, int]] = set()
-    visited: set[int] = set()
-    in_progress: set[int] = set()
+    offsets = [0]
+    targets: list[int] = []
+    for vertices in adjacent:
+        targets.extend(index[v] for v in vertices)
+        offsets.append(len(targets))
+    return offsets, targets
 
-    def dfs(vertex: int, path: list[int] | None = None) -> bool:
-        """
-        Depth-first search to detect cycles.
 
-        Args:
-            vertex: Current vertex being explored
-            path: Path taken to reach the current vertex
+def depth_first_search(G: Graph) -> tuple[list[int], list[tuple[int, int]]]:
+    """
+    Iterative depth-first search over all of G, starting from the vertices in
+    the order of G.V. Returns the vertex indices in postorder and the back
+    edges, as pairs of vertex indices, which are the edges to a vertex still
+    on the stack. Without the back edges G is a DAG, and the reverse postorder
+    is a topological sort of it.
+    """
+    offsets, targets = successors(G)
+    n = len(offsets) - 1
 
-        Returns:
-            True if a cycle was detected and removed, False otherwise
-        """
-        if path is None:
-            path = []
+    UNVISITED, ON_STACK, DONE = 0, 1, 2
+    state = [UNVISITED] * n
+    next_arc = offsets[:-1]  # Next arc to follow out of every vertex
 
-        # Already completely explored this vertex
-        if vertex in visited:
-            return False
+    postorder: list[int] = []
+    back_edges: list[tuple[int, int]] = []
+    for root in range(n):
+        if state[root] != UNVISITED:
+            continue
 
-        # Cycle detected
-        if vertex in in_progress:
-            # Remove the last edge in the cycle
-            u = path[-1]
-            v = vertex
+        state[root] = ON_STACK
+        stack = [root]
+        while stack:
+            x = stack[-1]
+            a = next_arc[x]
+            if a == offsets[x + 1]:
+                _ = stack.pop()
+                state[x] = DONE
+                postorder.append(x)
+                continue
+
+            next_arc[x] = a + 1
+            y = targets[a]
+            if state[y] == UNVISITED:
+                state[y] = ON_STACK
+                stack.append(y)
+            elif state[y] == ON_STACK:
+                back_edges.append((x, y))
+
+    return postorder, back_edges
+
+
+def strongly_connected_components(G: Graph) -> npt.NDArray[np.int64]:
+    """
+    Iterative Tarjan's algorithm. Returns the strongly connected component of
+    every vertex of G, by vertex index. Components are numbered in a
+    topological sort of the condensation, so every edge between two
+    components goes from a lower to a higher component.
+    """
+    offsets, targets = successors(G)
+    n = len(offsets) - 1
+
+    UNVISITED = -1
+    preorder = [UNVISITED] * n
+    low = [0] * n
+    on_stack = [False] * n
+    next_arc = offsets[:-1]  # Next arc to follow out of every vertex
+
+    # Tarjan's algorithm finds the components in reverse topological order
+    found = [0] * n
+    components = 0
+    visited = 0
+    stack: list[int] = []  # Vertices whose component is not found yet
+    for root in range(n):
+        if preorder[root] != UNVISITED:
+            continue
 
-            if (u, v) not in edges_to_remove:
-                edges_to_remove.add((u, v))
+        path = [root]
+        preorder[root] = low[root] = visited
+        visited += 1
+        stack.append(root)
+        on_stack[root] = True
+        while path:
+            x = path[-1]
+            a = next_arc[x]
+            if a < offsets[x + 1]:
+                next_arc[x] = a + 1
+                y = targets[a]
+                if preorder[y] == UNVISITED:
+                    preorder[y] = low[y] = visited
+                    visited += 1
+                    stack.append(y)
+                    on_stack[y] = True
+                    path.append(y)
+                elif on_stack[y] and preorder[y] < low[x]:
+                    low[x] = preorder[y]
+                continue
+
+            _ = path.pop()
+            if path and low[x] < low[path[-1]]:
+                low[path[-1]] = low[x]
+
+            if low[x] == preorder[x]:
+                while True:
+                    y = stack.pop()
+                    on_stack[y] = False
+                    found[y] = components
+                    if y == x:
+                        break
+                components += 1
+
+    return components - 1 - np.array(found, dtype=np.int64)
 
-            return True
 
-        in_progress.add(vertex)
-        path.append(vertex)
+def topological_sort(G: Graph) -> list[Vertex]:
+    postorder, _ = depth_first_search(G)
+    V = G.V
+    return [V[x] for x in reversed(postorder)]
 
-        # Check all neighbors
-        for neighbor in adj[vertex]:
-            if dfs(neighbor, path):
-                return True
 
-        # Vertex exploration complete
-        in_progress.remove(vertex)
-        visited.add(vertex)
-        _ = path.pop()
+def topological_sort_with_backwards_edges(
+    G: Graph,
+) -> tuple[list[Vertex], set[tuple[int, int]]]:
+    """
+    Topologically sorts G once the back edges of a depth-first search are
+    removed, and returns them as the backwards edges. This is the same as
+    sorting the graph left by remove_cycles, in a single search.
+    """
+    postorder, back_edges = depth_first_search(G)
+    V = G.V
+    return (
+        [V[x] for x in reversed(postorder)],
+        {(V[x], V[y]) for x, y in back_edges},
+    )
 
-        return False
 
-    # Process each vertex that hasn't been visited
-    for vertex in G.V:
-        if vertex not in visited and vertex not in in_progress:
-            dfs(vertex)
+def remove_cycles(
+    G: Graph,
+) -> tuple[Graph, set[tuple[int, int]]]:
+    """
+    Create a new graph without cycles, by removing the back edges of a
+    depth-first search. Every cycle contains at least one of them.
+    """
+    _, back_edges = depth_first_search(G)
+    V = G.V
+    edges_to_remove = {(V[x], V[y]) for x, y in back_edges}
 
     return (
         Graph(
@@ -298,36 +701,96 @@ def generate_random_capacities(g: Graph) -> Graph:
     )
 
 
-def parse_input(input: str, expected: int) -> tuple[Graph, list[int], list[int]]:
-    lines = input.strip().split("\n")
-    _, _, s, t = map(int, lines[0].split())
+@dataclass
+class EdgeList:
+    """
+    An input in the u-(c)>v format as arrays aligned by edge, with the vertex
+    ids of the input.
+    """
 
-    edges: list[tuple[int, int]] = []
-    capacities: list[int] = []
-    vertices: set[int] = set()
+    n: int
+    m: int
+    s: Vertex
+    t: Vertex
 
-    for line in lines[1:]:
-        u, rest = line.split("-(")
-        cap, v = rest.split(")>")
+    tails: npt.NDArray[np.int64]
+    heads: npt.NDArray[np.int64]
+    capacities: npt.NDArray[np.int64]
 
-        u, v = int(u), int(v)
-        if u == v:
-            continue
 
-        vertices.add(u)
-        vertices.add(v)
+# The separators of u-(c)>v, mapped to spaces so every line is three integers
+_EDGE_SEPARATORS = bytes.maketrans(b"-()>", b"    ")
 
-        edges.append((u, v))
-        capacities.append(int(cap))
 
-    # Remap vertices such that there are no holes
-    sorted_vertices = sorted(vertices)
-    vertex_map = {v: i for i, v in enumerate(sorted_vertices)}
-    edges = [(vertex_map[u], vertex_map[v]) for u, v in edges]
-    s = vertex_map[s]
-    t = vertex_map[t]
+def _parse_edges(block: bytes) -> npt.NDArray[np.int64]:
+    """
+    Returns the integers of the whole edge lines in block, three per edge.
+    """
+    values = np.fromstring(
+        block.translate(_EDGE_SEPARATORS).decode("ascii"), dtype=np.int64, sep=" "
+    )
+    edges = block.count(b"-(")
+    if len(values) != 3 * edges or block.count(b")>") != edges:
+        raise ValueError("Expected edges in the format u-(c)>v")
+    return values
+
+
+def read_edge_list(
+    source: str | os.PathLike[str] | BinaryIO, chunk_size: int = 1 << 24
+) -> EdgeList:
+    """
+    Reads an input in the u-(c)>v format from a file path or a binary buffer.
+    The edges are read and parsed chunk_size bytes at a time, each chunk in
+    bulk with NumPy, so the input never has to be in memory as a string.
+    """
+    if isinstance(source, str | os.PathLike):
+        with open(source, "rb") as f:
+            return read_edge_list(f, chunk_size)
+
+    n, m, s, t = map(int, source.readline().split())
+
+    chunks: list[npt.NDArray[np.int64]] = []
+    rest = b""
+    while chunk := source.read(chunk_size):
+        # Only parse whole lines, the last one may continue in the next chunk
+        chunk = rest + chunk
+        end = chunk.rfind(b"\n") + 1
+        chunks.append(_parse_edges(chunk[:end]))
+        rest = chunk[end:]
+    chunks.append(_parse_edges(rest))
+
+    edges = np.concatenate(chunks).reshape(-1, 3)
+    return EdgeList(
+        n=n,
+        m=m,
+        s=s,
+        t=t,
+        tails=edges[:, 0],
+        heads=edges[:, 2],
+        capacities=edges[:, 1],
+    )
+
+
+def load_input(
+    source: str | os.PathLike[str] | BinaryIO, expected: int
+) -> tuple[Graph, list[int], list[int]]:
+    """
+    Reads an input like parse_input, from a file path or a binary buffer.
+    """
+    edges = read_edge_list(source)
+
+    # Self-loops are dropped and the vertices of the other edges remapped to
+    # 0..n-1 in increasing order, such that there are no holes
+    keep = edges.tails != edges.heads
+    tails, heads = edges.tails[keep], edges.heads[keep]
+    vertices, ends = np.unique(np.concatenate((tails, heads)), return_inverse=True)
+    n, m = len(vertices), len(tails)
+
+    s, t = np.searchsorted(vertices, [edges.s, edges.t]).tolist()
+    for x, v in ((s, edges.s), (t, edges.t)):
+        if x == n or vertices[x] != v:
+            raise ValueError(f"Vertex {v} is not on any edge")
 
-    n = len(sorted_vertices)
     sources = [0] * n
     sinks = [0] * n
 
@@ -338,10 +801,15 @@ def parse_input(input: str, expected: int) -> tuple[Graph, list[int], list[int]]
         "instance",
         {
             "n": n,
-            "m": len(edges),
+            "m": m,
             "s": s,
             "t": t,
         },
     )
 
-    return (Graph(list(range(len(sorted_vertices))), edges, capacities), sources, sinks)
+    E = list(zip(ends[:m].tolist(), ends[m:].tolist()))
+    return (Graph(list(range(n)), E, edges.capacities[keep].tolist()), sources, sinks)
+
+
+def parse_input(input: str, expected: int) -> tuple[Graph, list[int], list[int]]:
+    return load_input(io.BytesIO(input.strip().encode()), expected)
@@ -1,4 +1,3 @@
-from src.utils import Edge
 import os
 import json
 
@@ -14,7 +13,7 @@ ENABLED = os.environ.get("VISUALISE", False)
 
 
 def graphviz_frame(
-    instance: "WeightedPushRelabel", kind: str = "", aug_path: set[Edge] | None = None
+    instance: "WeightedPushRelabel", kind: str = "", aug_path: set[int] | None = None
 ):
     global frames
 
@@ -27,52 +26,50 @@ def graphviz_frame(
     path = f"frames/iter_{frames}.dot"
     frames += 1
 
-    all_edges: set[Edge] = set()
-    for v in instance.G.V:
-        all_edges.update(instance.G.outgoing[v])
+    csr = instance.G.csr
+    V = instance.G.V
 
     nodes: set[str] = set()
     edges: list[str] = list()
 
-    for e in all_edges:
+    def mk_node(x: int):
+        color = "black" if x in instance.alive else "firebrick3"
+        style = "solid" if x in instance.alive else "dashed"
+        return f'{V[x]} [label="{V[x]} ({instance.l[x]:>2})", color="{color}", fontcolor="{color}", style="{style}"];'
 
-        def mk_node(v: int):
-            color = "black" if v in instance.alive else "firebrick3"
-            style = "solid" if v in instance.alive else "dashed"
-            return f'{v} [label="{v} ({instance.l[v]:>2})", color="{color}", fontcolor="{color}", style="{style}"];'
+    for i, a in enumerate(csr.edge_arcs.tolist()):
+        a_rev = int(csr.reverse[a])
+        x, y = int(csr.tails[a]), int(csr.targets[a])
 
-        nodes.add(mk_node(e.u))
-        nodes.add(mk_node(e.v))
-
-        if not e.forward:
-            continue
+        nodes.add(mk_node(x))
+        nodes.add(mk_node(y))
 
         dir = "forward"
-        if instance.c_f(e.reversed()) > 0:
-            if instance.c_f(e) == 0:
+        if instance.c_f(a_rev) > 0:
+            if instance.c_f(a) == 0:
                 dir = "back"
             else:
                 dir = "both"
 
         color = "black"
         style = "solid"
-        if instance.c_f(e) == 0:
+        if instance.c_f(a) == 0:
             color = "firebrick3"
-        elif instance.f[e] > 0:
-            if e in instance.admissible_outgoing[e.start()]:
+        elif instance.f[i] > 0:
+            if a in instance.admissible_outgoing[x]:
                 color = "chartreuse4"
             else:
                 color = "goldenrod"
                 style = "dashed"
-        elif e not in instance.admissible_outgoing[e.start()]:
+        elif a not in instance.admissible_outgoing[x]:
             color = "gray"
             style = "dashed"
 
-        if e in aug_path or e.reversed() in aug_path:
+        if a in aug_path or a_rev in aug_path:
             color = "blue"
 
         attrs = {
-            "label": f"{instance.c_f(e)}/{instance.c_f(e.reversed())}/{e.c}\\lw={instance.w(e)}",
+            "label": f"{instance.c_f(a)}/{instance.c_f(a_rev)}/{csr.capacities[a]}\\lw={instance.arc_w[a]}",
             "color": color,
             "style": style,
             "dir": dir,
@@ -81,7 +78,7 @@ def graphviz_frame(
         }
 
         attrs_str = ",".join(f'{k}="{v}"' for k, v in attrs.items())
-        edges.append(f"{e.u} -> {e.v} [{attrs_str}];")
+        edges.append(f"{V[x]} -> {V[y]} [{attrs_str}];")
 
     with open(path, "w") as f:
         _ = f.write("digraph G {\n")
@@ -92,32 +89,31 @@ def graphviz_frame(
 
 
 def init_custom_visualisation(instance: "WeightedPushRelabel"):
-    all_edges: set[Edge] = set()
-    for v in instance.G.V:
-        all_edges.update(instance.G.outgoing[v])
-
     output = {"nodes": [], "links": [], "frames": []}
 
-    for e in all_edges:
-        if not e.forward:
-            continue
+    if not ENABLED:
+        return output
+
+    csr = instance.G.csr
+    V = instance.G.V
 
+    for i, a in enumerate(csr.edge_arcs.tolist()):
         output["links"].append(
             {
-                "source": e.u,
-                "target": e.v,
-                "capacity": e.c,
-                "id": e.id,
-                "weight": instance.w(e),
+                "source": V[csr.tails[a]],
+                "target": V[csr.targets[a]],
+                "capacity": int(csr.capacities[a]),
+                "id": i + 1,
+                "weight": instance.arc_w[a],
             }
         )
 
-    for v in instance.G.V:
+    for x, v in enumerate(V):
         node = {"id": v}
 
-        if instance.sources[v] > 0:
+        if instance.delta[x] > 0:
             node["source"] = True
-        if instance.sinks[v] > 0:
+        if instance.nabla[x] > 0:
             node["sink"] = True
 
         output["nodes"].append(node)
@@ -129,14 +125,12 @@ def write_custom_frame_into(
     instance: "WeightedPushRelabel",
     output: dict,
     label: str | None = None,
-    augmenting_path: list[Edge] | None = None,
+    augmenting_path: list[int] | None = None,
 ):
     if not ENABLED:
         return
 
-    all_edges: set[Edge] = set()
-    for v in instance.G.V:
-        all_edges.update(instance.G.outgoing[v])
+    csr = instance.G.csr
 
     frame = {
         "label": label,
@@ -146,22 +140,21 @@ def write_custom_frame_into(
     }
 
     if augmenting_path is not None:
-        frame["augmentingPath"] = [e.id for e in augmenting_path]
-
-    for e in all_edges:
-        if not e.forward:
-            continue
-
-        frame["edges"][e.id] = {
-            "flow": instance.f.get(e, 0),
-            "remainingCapacity": instance.c_f(e),
-            "weight": instance.w(e),
-            "admissible": e in instance.admissible_outgoing[e.start()],
-            "reverseAdmissible": e.reversed() in instance.admissible_outgoing[e.end()],
+        frame["augmentingPath"] = [int(csr.edge_ids[a]) + 1 for a in augmenting_path]
+
+    for i, a in enumerate(csr.edge_arcs.tolist()):
+        a_rev = int(csr.reverse[a])
+        frame["edges"][i + 1] = {
+            "flow": instance.f[i],
+            "remainingCapacity": instance.c_f(a),
+            "weight": instance.arc_w[a],
+            "admissible": a in instance.admissible_outgoing[int(csr.tails[a])],
+            "reverseAdmissible": a_rev
+            in instance.admissible_outgoing[int(csr.tails[a_rev])],
         }
 
-    for v in instance.G.V:
-        frame["vertices"][v] = {"alive": v in instance.alive, "height": instance.l[v]}
+    for x, v in enumerate(instance.G.V):
+        frame["vertices"][v] = {"alive": x in instance.alive, "height": instance.l[x]}
 
     output["frames"].append(frame)
 
@@ -1,17 +1,75 @@
 from collections import defaultdict
-from collections.abc import Callable
-from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from functools import partial
+import heapq
+import os
 import time
 
+import numpy as np
+
 from src import benchmark
 from tests.utils import bench
+from . import visualisation
+from .link_cut_tree import LinkCutTree
 from .visualisation import (
     export_custom_visualisation,
     graphviz_frame,
     init_custom_visualisation,
     write_custom_frame_into,
 )
-from .utils import Edge, Graph, Vertex, next_multiple_of
+from .weights import Weights, edge_weights
+from .utils import (
+    Graph,
+    InducedSubgraph,
+    MinIndexedSet,
+    Vertex,
+    next_multiple_of,
+)
+
+# Slots of the hot benchmark counters, which solve records under "blik"
+ITERATIONS = benchmark.counter("blik.iterations")
+RELABELS = benchmark.counter("blik.relabels")
+RELABEL_EDGES = benchmark.counter("blik.relabel.edge_set.next")
+EDGE_UPDATES = benchmark.counter("blik.edge_updates")
+MARKED_ADMISSIBLE = benchmark.counter("blik.marked_admissible")
+STATE_CHANGE_MARKED_ADMISSIBLE = benchmark.counter(
+    "blik.state_change.marked_admissible"
+)
+STATE_CHANGE_ALREADY_MARKED_ADMISSIBLE = benchmark.counter(
+    "blik.state_change.already_marked_admissible"
+)
+DAG_MARKED_ADMISSIBLE = benchmark.counter("blik.dag_marked_admissible")
+MARKED_INADMISSIBLE = benchmark.counter("blik.marked_inadmissible")
+STATE_CHANGE_MARKED_INADMISSIBLE = benchmark.counter(
+    "blik.state_change.marked_inadmissible"
+)
+STATE_CHANGE_ALREADY_MARKED_INADMISSIBLE = benchmark.counter(
+    "blik.state_change.already_marked_inadmissible"
+)
+DAG_MARKED_INADMISSIBLE = benchmark.counter("blik.dag_marked_inadmissible")
+
+
+@dataclass
+class WarmStart:
+    """
+    Flow by edge index in G.E and labels by vertex index, which
+    WeightedPushRelabel starts from instead of zero. Empty lists start from
+    zero, like without a WarmStart.
+    """
+
+    f: list[int] = field(default_factory=list)
+    l: list[int] = field(default_factory=list)
+
+    def restrict(self, G: Graph, subgraph: InducedSubgraph) -> "WarmStart":
+        """
+        Returns the state on subgraph, a view of G or of the root of G.
+        """
+        vertices, edges = subgraph.indices_in(G)
+        return WarmStart(
+            f=[self.f[i] for i in edges.tolist()] if self.f else [],
+            l=[self.l[x] for x in vertices.tolist()] if self.l else [],
+        )
 
 
 @dataclass
@@ -21,148 +79,176 @@ class WeightedPushRelabel:
     c: list[int]
     sources: dict[Vertex, int]
     sinks: dict[Vertex, int]
-    w: Callable[[Edge], int]
+    w: Weights
     h: int
     dag_edges: set[tuple[Vertex, Vertex]] = field(default_factory=set)
-
-    # State from paper
-    f: dict[Edge, int] = field(default_factory=defaultdict[Edge, int])
-    l: dict[Vertex, int] = field(default_factory=dict)
-    alive: set[Vertex] = field(default_factory=set)
-    admissible_outgoing: dict[Vertex, set[Edge]] = field(default_factory=dict)
-    alive_vertices_with_no_admissible_out_edges: set[Vertex] = field(
-        default_factory=set
+    # Initial state, which gets the final flow and labels once solve is done
+    warm_start: WarmStart | None = None
+
+    # State from paper, vertices are indices into G.V and edges are arcs of G.csr
+    f: list[int] = field(default_factory=list)  # flow by edge index in G.E
+    net: list[int] = field(default_factory=list)  # net_flow by vertex index
+    l: list[int] = field(default_factory=list)
+    alive: set[int] = field(default_factory=set)
+    admissible_outgoing: dict[int, set[int]] = field(default_factory=dict)
+    alive_vertices_with_no_admissible_out_edges: "NoAdmissibleOutEdgesWorklist" = field(
+        init=False
     )
 
     # Extra state
-    unique_weights: dict[Vertex, list[int]] = field(default_factory=dict)
-
-    def solve(self) -> tuple[int, dict[Edge, int]]:
+    delta: list[int] = field(default_factory=list)  # sources by vertex index
+    nabla: list[int] = field(default_factory=list)  # sinks by vertex index
+    # Alive vertices with Δ_f(s) > 0, by their position in source_order, which
+    # are the vertices of sources in the order of the dict and then the others
+    active_sources: MinIndexedSet = field(init=False)
+    source_order: list[int] = field(default_factory=list)
+    source_rank: list[int] = field(default_factory=list)
+    # Outgoing arcs of every vertex grouped by weight in increasing order, and
+    # a heap of the (next multiple of weight above l[x], weight) events of
+    # every vertex
+    weight_buckets: list[dict[int, list[int]]] = field(default_factory=list)
+    next_multiples: list[list[tuple[int, int]]] = field(default_factory=list)
+    arc_w: list[int] = field(default_factory=list)
+    dag_arcs: list[bool] = field(default_factory=list)
+
+    # G.csr copied into lists, which are faster than NumPy for scalar access
+    offsets: list[int] = field(default_factory=list)
+    tails: list[int] = field(default_factory=list)
+    targets: list[int] = field(default_factory=list)
+    capacities: list[int] = field(default_factory=list)
+    reverse: list[int] = field(default_factory=list)
+    edge_ids: list[int] = field(default_factory=list)
+    forward: list[bool] = field(default_factory=list)
+
+    @benchmark.timed("blik")
+    def solve(self) -> tuple[int, list[int]]:
+        """
+        Returns the amount of routed flow and the flow on every edge, indexed
+        like G.E.
+        """
         benchmark.set_bench_scope("blik")
         benchmark.register("instance.h", self.h)
 
-        self.f = defaultdict(int)
-        self.l = {v: 0 for v in self.G.V}
-        self.alive = set(self.G.V)
+        self.prepare()
+        csr = self.G.csr
+
+        self.f = [0] * csr.m
+        self.net = [0] * csr.n
+        self.l = [0] * csr.n
+        self.alive = set(range(csr.n))
         self.admissible_outgoing = defaultdict(set)
-        self.alive_vertices_with_no_admissible_out_edges = set(self.G.V)
+        self.delta = [self.sources.get(v, 0) for v in self.G.V]
+        self.nabla = [self.sinks.get(v, 0) for v in self.G.V]
+        if self.warm_start is not None:
+            self.restore(self.warm_start)
+        self.alive_vertices_with_no_admissible_out_edges = NoAdmissibleOutEdgesWorklist(
+            csr.n
+        )
+        for x in range(csr.n):
+            self.alive_vertices_with_no_admissible_out_edges.add(
+                x, self.residual_sink(x) == 0
+            )
+        index = csr.index
+        in_sources = [index[v] for v in self.sources if v in index]
+        self.source_order = in_sources + sorted(set(range(csr.n)) - set(in_sources))
+        self.source_rank = [0] * csr.n
+        for i, x in enumerate(self.source_order):
+            self.source_rank[x] = i
+        self.active_sources = MinIndexedSet(
+            csr.n,
+            (self.source_rank[x] for x in range(csr.n) if self.residual_source(x) > 0),
+        )
 
         # Shorthands
-        w = {
-            e: self.w(e.forward_edge()) for e in self.G._all_edges()
-        }  # NOTE: Not included in benchmark
+        w = self.arc_w
         h = self.h
         f, l, c_f = self.f, self.l, self.c_f
+        targets, tails, reverse = self.targets, self.tails, self.reverse
+
+        self.next_multiples = [
+            [
+                (next_multiple_of(n=l[x], multiple_of=weight), weight)
+                for weight in buckets
+            ]
+            for x, buckets in enumerate(self.weight_buckets)
+        ]  # NOTE: Not included in benchmark
+        weight_buckets, next_multiples = self.weight_buckets, self.next_multiples
+        if self.warm_start is not None and self.warm_start.l:
+            self.mark_restored_labels()
+
+        def relabel(x: int):
+            # The next label is the smallest multiple of an incident weight
+            # above l[x], and only the edges of weights dividing it change
+            events = next_multiples[x]
+            l[x] = events[0][0] if events else 9 * h + 1
+
+            if benchmark.active:
+                benchmark.register_or_update_s(
+                    "highest_level", l[x], lambda y: max(y, l[x])
+                )
 
-        self.unique_weights = {
-            v: sorted(set(w[e] for e in self.G.incident.inner[v].inner))
-            for v in self.G.V
-        }  # NOTE: Not included in benchmark
-
-        def relabel(v: Vertex):
-            l[v] = min(
-                (
-                    next_multiple_of(n=l[v], multiple_of=weight)
-                    for weight in self.unique_weights[v]
-                ),
-                default=9 * h + 1,
-            )
-
-            benchmark.register_or_update_s(
-                "highest_level", l[v], lambda x: max(x, l[v])
-            )
-
-            if l[v] > 9 * h:
-                self.mark_dead(v)
+            if l[x] > 9 * h:
+                self.mark_dead(x)
                 return
 
-            benchmark.set_bench_scope("blik.relabel")
-            edges = self.G.incident[v]  # NOTE: Gets looped
-            benchmark.set_bench_scope("blik")
-
-            for e in (e for e in edges.inner if l[v] % w[e] == 0):
-                benchmark.register_or_update_s(
-                    "relabel.edge_set.next", 1, lambda x: x + 1
+            due: list[int] = []
+            while events and events[0][0] == l[x]:
+                weight = events[0][1]
+                heapq.heapreplace(
+                    events, (next_multiple_of(n=l[x], multiple_of=weight), weight)
                 )
-
-                x, y = e.start(), e.end()
-                if l[x] - l[y] >= 2 * w[e] and c_f(e) > 0:
-                    self.mark_admissible(e)
-                else:
-                    self.mark_inadmissible(e)
+                due.extend(weight_buckets[x][weight])
+            due.sort()
+
+            if benchmark.active:
+                benchmark.counts[RELABEL_EDGES] += 2 * len(due)
+
+            # The incident edges of x are its outgoing arcs and their reverses
+            for a in due:
+                for e in (a, reverse[a]):
+                    u, v = tails[e], targets[e]
+                    if l[u] - l[v] >= 2 * w[e] and c_f(e) > 0:
+                        self.mark_admissible(e)
+                    else:
+                        self.mark_inadmissible(e)
 
         graphviz_frame(self, "Initial")
         vis = init_custom_visualisation(self)
         write_custom_frame_into(self, vis, label="Initial")
 
         while True:
-            benchmark.register_or_update_s("iterations", 1, lambda x: x + 1)
+            if benchmark.active:
+                benchmark.counts[ITERATIONS] += 1
 
-            for v in AliveSaturatedVerticesWithNoAdmissibleOutEdges(self):
-                relabel(v)
-                benchmark.register_or_update_s("relabels", 1, lambda x: x + 1)
+            with benchmark.timed("relabel"):
+                for x in AliveSaturatedVerticesWithNoAdmissibleOutEdges(self):
+                    relabel(x)
+                    if benchmark.active:
+                        benchmark.counts[RELABELS] += 1
 
             graphviz_frame(self, "After relabel")
             write_custom_frame_into(self, vis, label="After relabel")
 
             if (s := self.find_alive_vertex_with_excess()) is not None:
-                P = self.trace_path(
-                    s
-                )  # NOTE: P gets looped but doesn't count in the benchmark
-                assert P is not None, "Path not found, but we always expect one."
-
-                graphviz_frame(self, "Traced path", aug_path=set(P))
-                write_custom_frame_into(
-                    self, vis, label="Traced path", augmenting_path=P
-                )
-
-                t = P[-1].end()
+                with benchmark.timed("augment"):
+                    self.augment(s, vis)
 
-                c_augment = min(
-                    self.residual_source(s),
-                    self.residual_sink(t),
-                    min(c_f(e) for e in P),
-                )
-
-                benchmark.register_or_update_s(
-                    "max_edge_updates", len(P), lambda x: max(x, len(P or []))
-                )
-                benchmark.register_or_update_s(
-                    "min_edge_updates", len(P), lambda x: min(x, len(P or []))
-                )
-
-                for e in P:
-                    benchmark.register_or_update_s("edge_updates", 1, lambda x: x + 1)
-
-                    if e.forward:
-                        f[e] += c_augment
-                    else:
-                        f[e.forward_edge()] -= c_augment
+                if benchmark.active:
 
-                    # "Adjust ..." - is this automatically done via c_f()?
+                    def transfer_bench_key(from_key: str, to_key: str):
+                        benchmark.register_or_update_s(
+                            to_key,
+                            benchmark.get_or_default_s(from_key, 0) or 0,
+                            lambda x: benchmark.get_or_default_s(to_key, 0) or 0,
+                        )
 
-                    if c_f(e) == 0:
-                        self.mark_inadmissible(e)
-
-                sum_w = sum(w[e] for e in P)
-                benchmark.register_or_update_s(
-                    "average_w_length",
-                    sum_w / c_augment,
-                    lambda x: x + (sum_w / c_augment),
-                )
-
-                def transfer_bench_key(from_key: str, to_key: str):
-                    benchmark.register_or_update_s(
-                        to_key,
-                        benchmark.get_or_default_s(from_key, 0) or 0,
-                        lambda x: benchmark.get_or_default_s(to_key, 0) or 0,
+                    transfer_bench_key("relabels", "before_kill.relabels")
+                    transfer_bench_key(
+                        "marked_admissible", "before_kill.marked_admissible"
+                    )
+                    transfer_bench_key(
+                        "marked_inadmissible", "before_kill.marked_inadmissible"
                     )
-
-                transfer_bench_key("relabels", "before_kill.relabels")
-                transfer_bench_key("marked_admissible", "before_kill.marked_admissible")
-                transfer_bench_key(
-                    "marked_inadmissible", "before_kill.marked_inadmissible"
-                )
 
                 graphviz_frame(self, "After pushing")
                 write_custom_frame_into(self, vis, label="After pushing")
@@ -174,146 +260,435 @@ class WeightedPushRelabel:
                 result = self.amount_of_routed_flow(f)
                 finish_benchmark(result)
 
+                if self.warm_start is not None:
+                    self.warm_start.f = f.copy()
+                    self.warm_start.l = l.copy()
+
                 return result, f
 
-    def c_f(self, e: Edge):
-        f_e = self.f.get(e.forward_edge(), 0)
-        if e.forward:
-            return e.c - f_e
+    def prepare(self):
+        """
+        Builds the state which only depends on G, w and dag_edges, unless it
+        is there already. Copies of a prepared instance with other sources,
+        sinks or h share it, see weighted_push_relabel_batch.
+        """
+        if self.offsets:
+            return
+
+        csr = self.G.csr
+        self.offsets = csr.offsets.tolist()
+        self.tails = csr.tails.tolist()
+        self.targets = csr.targets.tolist()
+        self.capacities = csr.capacities.tolist()
+        self.reverse = csr.reverse.tolist()
+        self.edge_ids = csr.edge_ids.tolist()
+        self.forward = csr.forward.tolist()
+        self.dag_arcs = (
+            [
+                (u, v) in self.dag_edges
+                for u, v in zip(
+                    csr.vertices[csr.tails].tolist(),
+                    csr.vertices[csr.targets].tolist(),
+                )
+            ]
+            if self.dag_edges
+            else [False] * len(self.tails)
+        )  # NOTE: Not included in benchmark
+
+        arc_w = edge_weights(self.G, self.w)[csr.edge_ids]
+        self.arc_w = arc_w.tolist()
+
+        # Sort the arcs by tail and weight, so every bucket is a slice
+        order = np.lexsort((arc_w, csr.tails))
+        tails, weights = csr.tails[order], arc_w[order]
+        starts = np.flatnonzero(
+            (np.diff(tails, prepend=-1) != 0) | (np.diff(weights, prepend=-1) != 0)
+        )
+        ends = np.append(starts[1:], len(order))
+
+        arcs = order.tolist()
+        self.weight_buckets = [{} for _ in range(csr.n)]
+        for x, weight, start, end in zip(
+            tails[starts].tolist(),
+            weights[starts].tolist(),
+            starts.tolist(),
+            ends.tolist(),
+        ):
+            self.weight_buckets[x][weight] = arcs[start:end]
+
+    def restore(self, warm_start: WarmStart):
+        """
+        Starts from the flow and labels of warm_start, clamped to the
+        capacities and to [0, 9h + 1]. Flow is then cancelled out of every
+        vertex which sends more than it receives plus its source, until f is a
+        preflow for the current sources and sinks again.
+        """
+        f, net, delta = self.f, self.net, self.delta
+
+        if warm_start.f:
+            for i, a in enumerate(self.G.csr.edge_arcs.tolist()):
+                f[i] = min(max(warm_start.f[i], 0), self.capacities[a])
+                net[self.tails[a]] -= f[i]
+                net[self.targets[a]] += f[i]
+
+            deficits = [x for x in range(len(net)) if net[x] + delta[x] < 0]
+            while deficits:
+                x = deficits.pop()
+                for a in range(self.offsets[x], self.offsets[x + 1]):
+                    deficit = -(net[x] + delta[x])
+                    if deficit <= 0:
+                        break
+                    if not self.forward[a] or f[self.edge_ids[a]] == 0:
+                        continue
+
+                    y = self.targets[a]
+                    cancel = min(f[self.edge_ids[a]], deficit)
+                    f[self.edge_ids[a]] -= cancel
+                    net[x] += cancel
+                    net[y] -= cancel
+                    if net[y] + delta[y] < 0:
+                        deficits.append(y)
+
+        if warm_start.l:
+            top = 9 * self.h + 1
+            self.l[:] = [min(max(label, 0), top) for label in warm_start.l]
+
+    def mark_restored_labels(self):
+        """
+        Kills the vertices with restored labels above 9h and marks the
+        admissible edges between the others, which relabel would otherwise
+        only find once it reaches the labels.
+        """
+        l, w = self.l, self.arc_w
+        for x in range(len(l)):
+            if l[x] > 9 * self.h:
+                self.mark_dead(x)
+
+        for a, (u, v) in enumerate(zip(self.tails, self.targets)):
+            if u in self.alive and l[u] - l[v] >= 2 * w[a] and self.c_f(a) > 0:
+                self.mark_admissible(a)
+
+    def augment(self, s: int, vis: dict):
+        """
+        Pushes as much flow as possible from s along a path of admissible
+        edges to a sink.
+        """
+        c_f = self.c_f
+
+        P = self.trace_path(s)  # NOTE: P gets looped but doesn't count in the benchmark
+        assert P is not None, "Path not found, but we always expect one."
+
+        graphviz_frame(self, "Traced path", aug_path=set(P))
+        write_custom_frame_into(self, vis, label="Traced path", augmenting_path=P)
+
+        t = self.targets[P[-1]]
+
+        c_augment = min(
+            self.residual_source(s),
+            self.residual_sink(t),
+            min(c_f(e) for e in P),
+        )
+        assert c_augment > 0, "Augmenting path can't carry any flow."
+
+        if benchmark.active:
+            benchmark_path(len(P), sum(self.arc_w[e] for e in P), c_augment)
+
+        for e in P:
+            if self.forward[e]:
+                self.f[self.edge_ids[e]] += c_augment
+            else:
+                self.f[self.edge_ids[e]] -= c_augment
+
+            # "Adjust ..." - is this automatically done via c_f()?
+
+            if c_f(e) == 0:
+                self.mark_inadmissible(e)
+
+        self.update_path_ends(s, t, c_augment)
+
+    def update_path_ends(self, s: int, t: int, c_augment: int):
+        """
+        Updates the vertex state after c_augment was pushed from s to t.
+        """
+        # Flow is conserved on the inner vertices of the path
+        self.net[s] -= c_augment
+        self.net[t] += c_augment
+        if self.residual_sink(t) == 0:
+            self.alive_vertices_with_no_admissible_out_edges.saturate(t)
+        self.update_active_source(s)
+        self.update_active_source(t)
+
+    def c_f(self, e: int) -> int:
+        f_e = self.f[self.edge_ids[e]]
+        if self.forward[e]:
+            return self.capacities[e] - f_e
         else:
             return f_e
 
-    def mark_admissible(self, e: Edge):
-        benchmark.register_or_update_s("marked_admissible", 1, lambda x: x + 1)
-        if e not in self.admissible_outgoing[e.start()]:
-            benchmark.register_or_update_s(
-                "state_change.marked_admissible", 1, lambda x: x + 1
-            )
-        else:
-            benchmark.register_or_update_s(
-                "state_change.already_marked_admissible", 1, lambda x: x + 1
-            )
+    def mark_admissible(self, e: int):
+        x = self.tails[e]
 
-        if (e.start(), e.end()) in self.dag_edges:
-            benchmark.register_or_update_s("dag_marked_admissible", 1, lambda x: x + 1)
+        if benchmark.active:
+            counts = benchmark.counts
+            counts[MARKED_ADMISSIBLE] += 1
+            if e not in self.admissible_outgoing[x]:
+                counts[STATE_CHANGE_MARKED_ADMISSIBLE] += 1
+            else:
+                counts[STATE_CHANGE_ALREADY_MARKED_ADMISSIBLE] += 1
 
-        self.admissible_outgoing[e.start()].add(e)
-        self.alive_vertices_with_no_admissible_out_edges.discard(e.start())
+            if self.dag_arcs[e]:
+                counts[DAG_MARKED_ADMISSIBLE] += 1
 
-    def mark_inadmissible(self, e: Edge):
-        benchmark.register_or_update_s("marked_inadmissible", 1, lambda x: x + 1)
-        if e in self.admissible_outgoing[e.start()]:
-            benchmark.register_or_update_s(
-                "state_change.marked_inadmissible", 1, lambda x: x + 1
-            )
-        else:
-            benchmark.register_or_update_s(
-                "state_change.already_marked_inadmissible", 1, lambda x: x + 1
-            )
-        if (e.start(), e.end()) in self.dag_edges:
-            benchmark.register_or_update_s(
-                "dag_marked_inadmissible", 1, lambda x: x + 1
-            )
+        self.admissible_outgoing[x].add(e)
+        self.alive_vertices_with_no_admissible_out_edges.discard(x)
 
-        self.admissible_outgoing[e.start()].discard(e)
-        if len(self.admissible_outgoing[e.start()]) == 0 and e.start() in self.alive:
-            self.alive_vertices_with_no_admissible_out_edges.add(e.start())
+    def mark_inadmissible(self, e: int):
+        x = self.tails[e]
 
-    def mark_dead(self, v: Vertex):
-        benchmark.register_or_update_s("marked_dead", 1, lambda x: x + 1)
-        if v not in self.alive:
-            benchmark.register_or_update_s(
-                "marked_dead_alread_dead", 1, lambda x: x + 1
+        if benchmark.active:
+            counts = benchmark.counts
+            counts[MARKED_INADMISSIBLE] += 1
+            if e in self.admissible_outgoing[x]:
+                counts[STATE_CHANGE_MARKED_INADMISSIBLE] += 1
+            else:
+                counts[STATE_CHANGE_ALREADY_MARKED_INADMISSIBLE] += 1
+            if self.dag_arcs[e]:
+                counts[DAG_MARKED_INADMISSIBLE] += 1
+
+        self.admissible_outgoing[x].discard(e)
+        if len(self.admissible_outgoing[x]) == 0 and x in self.alive:
+            self.alive_vertices_with_no_admissible_out_edges.add(
+                x, self.residual_sink(x) == 0
             )
 
-        self.alive.remove(v)
-        self.alive_vertices_with_no_admissible_out_edges.discard(v)
+    def mark_dead(self, x: int):
+        benchmark.count_s("marked_dead")
+        if x not in self.alive:
+            benchmark.count_s("marked_dead_alread_dead")
 
-    def absorption(self, v: Vertex) -> int:
-        return min(self.net_flow(v) + self.sources[v], self.sinks[v])
+        self.alive.remove(x)
+        self.alive_vertices_with_no_admissible_out_edges.discard(x)
+        self.active_sources.discard(self.source_rank[x])
 
-    def excess(self, v: Vertex) -> int:
-        return self.net_flow(v) + self.sources[v] - self.absorption(v)
+    def update_active_source(self, x: int):
+        if x in self.alive and self.residual_source(x) > 0:
+            self.active_sources.add(self.source_rank[x])
+        else:
+            self.active_sources.discard(self.source_rank[x])
+
+    def absorption(self, x: int) -> int:
+        return min(self.net_flow(x) + self.delta[x], self.nabla[x])
+
+    def excess(self, x: int) -> int:
+        return self.net_flow(x) + self.delta[x] - self.absorption(x)
 
     # This is exactly B^TG(v) from the paper - or alternatively "-f^out(v)".
-    def net_flow(self, v: Vertex) -> int:
-        benchmark.set_bench_scope("blik.net_flow")
-        recv = sum(self.f.get(e, 0) for e in self.G.incoming[v])  # NOTE: Loops edges
-        send = sum(self.f.get(e, 0) for e in self.G.outgoing[v])  # NOTE: Loops edges
-        benchmark.set_bench_scope("blik")
-        return recv - send
+    # Kept up to date by solve, which only changes it at the ends of a path.
+    def net_flow(self, x: int) -> int:
+        return self.net[x]
 
-    def residual_source(self, v: Vertex) -> int:
+    def residual_source(self, x: int) -> int:
         """Corresponds to Δ_f(s)"""
-        return self.excess(v)
+        return self.excess(x)
 
-    def residual_sink(self, v: Vertex) -> int:
+    def residual_sink(self, x: int) -> int:
         """Corresponds to ∇_f(t)"""
-        return self.sinks[v] - self.absorption(v)
+        return self.nabla[x] - self.absorption(x)
 
-    # Black box for line 15 of Alg. 1 in the paper.
-    def find_alive_vertex_with_excess(self) -> Vertex | None:
-        for s in self.sources:
-            if s in self.alive and self.residual_source(s) > 0:
-                return s
-        return None
+    # Black box for line 15 of Alg. 1 in the paper. Takes the first source in
+    # the order of sources, so the result doesn't depend on the data structure.
+    def find_alive_vertex_with_excess(self) -> int | None:
+        if len(self.active_sources) == 0:
+            return None
+        return self.source_order[self.active_sources.min()]
 
-    def trace_path(self, s: Vertex) -> list[Edge] | None:
-        parent: dict[Vertex, Edge] = {}
+    @benchmark.timed("trace_path")
+    def trace_path(self, s: int) -> list[int] | None:
+        parent: dict[int, int] = {}
 
         stack = [s]
-        visited: set[Vertex] = set()
+        visited: set[int] = set()
 
         while len(stack) > 0:
-            v = stack.pop()
-
-            # If we have reached the sink, we are done
-            if self.sinks[v] > 0:
-                path: list[Edge] = []
-                while v in parent.keys() and v != s:
-                    path.append(parent[v])
-                    v = parent[v].start()
+            x = stack.pop()
+
+            # If we have reached a sink which can absorb flow, we are done.
+            # Saturated sinks are passed through like any other vertex.
+            if self.residual_sink(x) > 0:
+                path: list[int] = []
+                while x in parent.keys() and x != s:
+                    path.append(parent[x])
+                    x = self.tails[parent[x]]
                 path.reverse()
                 return path
 
-            for e in self.admissible_outgoing[v]:
-                if e.end() in visited:
+            for e in self.admissible_outgoing[x]:
+                y = self.targets[e]
+                if y in visited:
                     continue
 
-                visited.add(e.end())
-                stack.append(e.end())
-                parent[e.end()] = e
+                visited.add(y)
+                stack.append(y)
+                parent[y] = e
 
         return None
 
-    def amount_of_routed_flow(self, f: dict[Edge, int]) -> int:
+    def amount_of_routed_flow(self, f: list[int]) -> int:
         amount = 0
-        for s in self.sources:
-            if self.sources[s] > 0:
-                amount += sum(f.get(e, 0) for e in self.G.outgoing[s])
+        for s, delta in enumerate(self.delta):
+            if delta > 0:
+                amount += sum(
+                    f[self.edge_ids[a]]
+                    for a in range(self.offsets[s], self.offsets[s + 1])
+                    if self.forward[a]
+                )
         return amount
 
 
+@dataclass
+class WeightedPushRelabelWithDynamicTrees(WeightedPushRelabel):
+    """
+    WeightedPushRelabel which keeps a forest of admissible edges in a link-cut
+    tree, with every vertex pointing along at most one admissible outgoing
+    edge. Paths are traced and augmented in amortized O(log n) time per edge
+    linked or cut, instead of a DFS and a walk over every edge of the path.
+
+    The residual capacity of a tree edge lives in the tree and is only written
+    back to f when the edge is cut, or when solve finishes.
+    """
+
+    tree: LinkCutTree = field(init=False)
+    tree_arc: list[int] = field(default_factory=list)  # arc to parent, or -1
+
+    def solve(self) -> tuple[int, list[int]]:
+        self.tree = LinkCutTree(len(self.G.V))
+        self.tree_arc = [-1] * len(self.G.V)
+        return super().solve()
+
+    def augment(self, s: int, vis: dict):
+        tree, tree_arc, targets = self.tree, self.tree_arc, self.targets
+
+        # Roots of trees which can't reach a sink
+        blocked: set[int] = set()
+
+        while self.residual_sink(t := tree.find_root(s)) == 0:
+            for e in self.admissible_outgoing[t]:
+                z = tree.find_root(targets[e])
+                if z != t and z not in blocked:
+                    tree.link(t, targets[e], self.c_f(e), self.arc_w[e])
+                    tree_arc[t] = e
+                    break
+            else:
+                assert t != s, "Path not found, but we always expect one."
+                blocked.add(t)
+                self.cut(tree.root_child(s))
+
+        assert t != s, "Path not found, but we always expect one."
+
+        if visualisation.ENABLED:
+            P = [tree_arc[x] for x in tree.path(s)[:-1]]
+            graphviz_frame(self, "Traced path", aug_path=set(P))
+            write_custom_frame_into(self, vis, label="Traced path", augmenting_path=P)
+
+        c_augment = min(
+            self.residual_source(s),
+            self.residual_sink(t),
+            int(tree.path_min(s)[0]),
+        )
+        assert c_augment > 0, "Augmenting path can't carry any flow."
+
+        if benchmark.active:
+            benchmark_path(tree.path_length(s), tree.path_weight(s), c_augment)
+
+        tree.path_add(s, -c_augment)
+
+        # Cut saturated edges, continuing above each cut towards t
+        x = s
+        while True:
+            bottleneck, y = tree.path_min(x)
+            if bottleneck != 0:
+                break
+            x = targets[tree_arc[y]]
+            self.mark_inadmissible(tree_arc[y])
+
+        self.update_path_ends(s, t, c_augment)
+
+    def c_f(self, e: int) -> int:
+        x = self.tails[e]
+        if self.tree_arc[x] == e:
+            return int(self.tree.get_value(x))
+
+        # c_f(e) + c_f(reverse(e)) is the capacity of the edge
+        y = self.targets[e]
+        if self.tree_arc[y] == self.reverse[e]:
+            return self.capacities[e] - int(self.tree.get_value(y))
+
+        return super().c_f(e)
+
+    def mark_inadmissible(self, e: int):
+        x = self.tails[e]
+        if self.tree_arc[x] == e:
+            self.cut(x)
+        super().mark_inadmissible(e)
+
+    def cut(self, x: int):
+        """
+        Cuts the tree edge out of x and writes its flow back to f.
+        """
+        e = self.tree_arc[x]
+        residual = int(self.tree.cut(x))
+        if self.forward[e]:
+            self.f[self.edge_ids[e]] = self.capacities[e] - residual
+        else:
+            self.f[self.edge_ids[e]] = residual
+        self.tree_arc[x] = -1
+
+    def amount_of_routed_flow(self, f: list[int]) -> int:
+        # Called once solve is done, so the tree can be emptied into f
+        for x, e in enumerate(self.tree_arc):
+            if e != -1:
+                self.cut(x)
+        return super().amount_of_routed_flow(f)
+
+
+def benchmark_path(length: int, sum_w: int, c_augment: int):
+    """
+    Records an augmenting path of length edges and total weight sum_w.
+    """
+    benchmark.register_or_update_s("max_edge_updates", length, lambda x: max(x, length))
+    benchmark.register_or_update_s("min_edge_updates", length, lambda x: min(x, length))
+    benchmark.counts[EDGE_UPDATES] += length
+    benchmark.register_or_update_s(
+        "average_w_length",
+        sum_w / c_augment,
+        lambda x: x + (sum_w / c_augment),
+    )
+
+
 def weighted_push_relabel(
     G: Graph,
     c: list[int],
     sources: list[int],
     sinks: list[int],
-    w: Callable[[Edge], int],
+    w: Weights,
     h: int,
     dag_edges: set[tuple[Vertex, Vertex]] | None = None,
-) -> tuple[int, dict[Edge, int]]:
+    dynamic_trees: bool = False,
+) -> tuple[int, list[int]]:
     """
     G: a graph (V, E)
     c: capacities for each edge
     sources: source nodes providing flow
     sinks: sink nodes receiving flow
-    w: weight function for edges
+    w: weight function for edges, or the weights aligned with G.E, see Weights
     h: height parameter
+    dynamic_trees: find and augment paths with link-cut trees instead of a DFS
     """
     _sources = {v: sources[i] for i, v in enumerate(G.V)}
     _sinks = {v: sinks[i] for i, v in enumerate(G.V)}
-    res = weighted_push_relabel_dict(G, c, _sources, _sinks, w, h, dag_edges)
+    res = weighted_push_relabel_dict(
+        G, c, _sources, _sinks, w, h, dag_edges, dynamic_trees
+    )
 
     return res
 
@@ -323,21 +698,24 @@ def weighted_push_relabel_dict(
     c: list[int],
     sources: dict[Vertex, int],
     sinks: dict[Vertex, int],
-    w: Callable[[Edge], int],
+    w: Weights,
     h: int,
     dag_edges: set[tuple[Vertex, Vertex]] | None = None,
-) -> tuple[int, dict[Edge, int]]:
+    dynamic_trees: bool = False,
+) -> tuple[int, list[int]]:
     """
     G: a graph (V, E)
     c: capacities for each edge
     sources: source nodes providing flow
     sinks: sink nodes receiving flow
-    w: weight function for edges
+    w: weight function for edges, or the weights aligned with G.E, see Weights
     h: height parameter
+    dynamic_trees: find and augment paths with link-cut trees instead of a DFS
     """
     start = time.time_ns()
 
-    instance = WeightedPushRelabel(G, c, sources, sinks, w, h)
+    cls = WeightedPushRelabelWithDynamicTrees if dynamic_trees else WeightedPushRelabel
+    instance = cls(G, c, sources, sinks, w, h)
     if dag_edges is not None:
         instance.dag_edges = dag_edges
 
@@ -349,6 +727,62 @@ def weighted_push_relabel_dict(
     return res
 
 
+def weighted_push_relabel_batch(
+    G: Graph,
+    c: list[int],
+    demands: list[tuple[dict[Vertex, int], dict[Vertex, int]]],
+    w: Weights,
+    h: int | list[int],
+    dag_edges: set[tuple[Vertex, Vertex]] | None = None,
+    dynamic_trees: bool = False,
+    processes: int | None = 1,
+) -> list[tuple[int, list[int]]]:
+    """
+    Solves weighted_push_relabel_dict for every (sources, sinks) in demands,
+    with the state which only depends on G and w built once.
+
+    h: height parameter, or one for every demand
+    processes: number of worker processes solving the demands, or None for
+        one per CPU
+
+    Returns the amount of routed flow and the flow on every edge of every
+    demand, in the order of demands.
+    """
+    cls = WeightedPushRelabelWithDynamicTrees if dynamic_trees else WeightedPushRelabel
+    template = cls(G, c, {}, {}, w, 0, dag_edges or set())
+    template.prepare()
+
+    # The weights are in the prepared state now, so w is replaced by the weight
+    # of every edge, which can be pickled whatever w was
+    edge_w = [template.arc_w[a] for a in G.csr.edge_arcs.tolist()]
+    template = replace(template, w=edge_w)
+
+    hs = h if isinstance(h, list) else [h] * len(demands)
+    assert len(hs) == len(demands), "Expected an h for every demand"
+
+    solve = partial(solve_demand, template)
+    if processes == 1:
+        return list(map(solve, demands, hs))
+
+    # Large chunks, so the template is only sent to every worker once
+    workers = processes or os.cpu_count() or 1
+    chunksize = max(-(-len(demands) // workers), 1)
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(solve, demands, hs, chunksize=chunksize))
+
+
+def solve_demand(
+    template: WeightedPushRelabel,
+    demand: tuple[dict[Vertex, int], dict[Vertex, int]],
+    h: int,
+) -> tuple[int, list[int]]:
+    """
+    Solves a copy of the prepared template with the given sources, sinks and h.
+    """
+    sources, sinks = demand
+    return replace(template, sources=sources, sinks=sinks, h=h).solve()
+
+
 # Black box for line 13 of Alg. 1 in the paper.
 class AliveSaturatedVerticesWithNoAdmissibleOutEdges:
     instance: WeightedPushRelabel
@@ -359,12 +793,53 @@ class AliveSaturatedVerticesWithNoAdmissibleOutEdges:
     def __iter__(self):
         return self
 
-    def __next__(self) -> Vertex:
-        for v in self.instance.alive_vertices_with_no_admissible_out_edges:
-            if self.instance.residual_sink(v) == 0:
-                return v
+    def __next__(self) -> int:
+        saturated = self.instance.alive_vertices_with_no_admissible_out_edges.saturated
+        if len(saturated) == 0:
+            raise StopIteration
+
+        # Relabeling either removes the vertex from the worklist or it is
+        # returned again. The smallest vertex first, like the scan over the
+        # set of vertices did
+        return saturated.min()
+
+
+class NoAdmissibleOutEdgesWorklist:
+    """
+    The alive vertices with no admissible outgoing edges, bucketed by whether
+    they are saturated (∇_f(v) = 0).
+
+    Only sinks can be unsaturated and absorption never decreases, so a vertex
+    only moves from `unsaturated` to `saturated`, when flow is pushed into it.
+    """
+
+    saturated: MinIndexedSet
+    unsaturated: set[int]
+
+    def __init__(self, n: int):
+        self.saturated = MinIndexedSet(n)
+        self.unsaturated = set()
+
+    def __contains__(self, x: int) -> bool:
+        return x in self.saturated or x in self.unsaturated
+
+    def add(self, x: int, is_saturated: bool):
+        if x in self.unsaturated:
+            return
+
+        if is_saturated:
+            self.saturated.add(x)
+        else:
+            self.unsaturated.add(x)
+
+    def discard(self, x: int):
+        self.saturated.discard(x)
+        self.unsaturated.discard(x)
 
-        raise StopIteration
+    def saturate(self, x: int):
+        if x in self.unsaturated:
+            self.unsaturated.remove(x)
+            self.saturated.add(x)
 
 
 if __name__ == "__main__":
@@ -378,8 +853,8 @@ if __name__ == "__main__":
     )
 
     print(f"Result: {mf} total flow")
-    for e, f in res.items():
-        print(f"  {f} flow via {e}")
+    for i, f in enumerate(res):
+        print(f"  {f} flow via {i}")
 
 
 def finish_benchmark(flow: int):
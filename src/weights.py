@@ -0,0 +1,208 @@
+from collections.abc import Callable, Collection, Sequence
+from functools import partial
+
+import numpy as np
+import numpy.typing as npt
+
+from .utils import (
+    Edge,
+    Graph,
+    Vertex,
+    arc_edge_ids,
+    strongly_connected_components,
+    topological_sort,
+    topological_sort_with_backwards_edges,
+)
+
+# The weight of every edge, as a function of one Edge, as a vectorised function
+# of the whole graph (see vectorised), or as weights aligned with G.E
+type Weights = (
+    Callable[[Edge], int]
+    | Callable[[Graph], npt.ArrayLike]
+    | Sequence[int]
+    | npt.NDArray[np.integer]
+)
+
+
+def vectorised[F: Callable[[Graph], npt.ArrayLike]](w: F) -> F:
+    """
+    Marks w as a weight function which takes a Graph and returns the weights
+    of all of its edges at once, aligned with G.E.
+    """
+    w.vectorised = True  # type: ignore[attr-defined]
+    return w
+
+
+def edge_weights(G: Graph, w: Weights) -> npt.NDArray[np.int64]:
+    """
+    Returns the weight of every edge of G, aligned with G.E.
+    """
+    if isinstance(w, np.ndarray | Sequence):
+        weights = np.asarray(w, dtype=np.int64)
+    elif getattr(w, "vectorised", False):
+        weights = np.asarray(w(G), dtype=np.int64)  # type: ignore[arg-type]
+    else:
+        # One call for the forward Edge of every edge, like G.edge builds it
+        csr = G.csr
+        ids = arc_edge_ids(G)[csr.edge_arcs].tolist()
+        capacities = csr.capacities[csr.edge_arcs].tolist()
+        weights = np.fromiter(
+            (
+                w(Edge(id=i + 1, u=u, v=v, c=c, forward=True))  # type: ignore[arg-type]
+                for i, (u, v), c in zip(ids, G.E, capacities)
+            ),
+            dtype=np.int64,
+            count=csr.m,
+        )
+
+    assert weights.shape == (G.csr.m,), "Expected a weight for every edge"
+    return weights
+
+
+def constant_weights(weight: int) -> Callable[[Graph], npt.NDArray[np.int64]]:
+    """
+    Gives every edge the same weight.
+    """
+    return vectorised(partial(_constant_weights, weight))
+
+
+def _constant_weights(weight: int, G: Graph) -> npt.NDArray[np.int64]:
+    return np.full(G.csr.m, weight, dtype=np.int64)
+
+
+def vertex_ranks(G: Graph, order: Sequence[Vertex]) -> npt.NDArray[np.int64]:
+    """
+    Returns the position in order of every vertex of G, by vertex index.
+    Vertices of order which are not in G are skipped.
+    """
+    index = G.csr.index
+    ranks = np.zeros(G.csr.n, dtype=np.int64)
+    positions = [(index[v], i) for i, v in enumerate(order) if v in index]
+    if positions:
+        xs, rs = zip(*positions)
+        ranks[list(xs)] = rs
+    return ranks
+
+
+def edge_ends(G: Graph) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """
+    Returns the vertex indices of the tail and head of every edge of G.
+    """
+    csr = G.csr
+    return csr.tails[csr.edge_arcs], csr.targets[csr.edge_arcs]
+
+
+def topological_rank_weights(
+    order: Sequence[Vertex] | None = None,
+) -> Callable[[Graph], npt.NDArray[np.int64]]:
+    """
+    Weighs every edge by the distance between its ends in order, which is a
+    topological sort of G unless given, e.g. the order of an expander
+    hierarchy.
+    """
+    return vectorised(partial(_topological_rank_weights, order))
+
+
+def _topological_rank_weights(
+    order: Sequence[Vertex] | None, G: Graph
+) -> npt.NDArray[np.int64]:
+    ranks = vertex_ranks(G, order if order is not None else topological_sort(G))
+    u, v = edge_ends(G)
+    return np.abs(ranks[v] - ranks[u])
+
+
+def flow_rank_weights(
+    flow: Sequence[int], default: int | None = None
+) -> Callable[[Graph], npt.NDArray[np.int64]]:
+    """
+    Weighs every edge with flow by the distance between its ends in a
+    topological sort of the DAG left of the edges with flow, once its cycles
+    are removed. Every other edge gets default, 100n unless given.
+    """
+    return vectorised(partial(_flow_rank_weights, flow, default))
+
+
+def _flow_rank_weights(
+    flow: Sequence[int], default: int | None, G: Graph
+) -> npt.NDArray[np.int64]:
+    ranks = vertex_ranks(G, topological_sort_induced_flow_dag(G, flow))
+    has_flow = np.asarray(flow, dtype=np.int64) > 0
+    u, v = edge_ends(G)
+    return np.where(
+        has_flow,
+        np.abs(ranks[v] - ranks[u]),
+        default if default is not None else 100 * len(G.V),
+    )
+
+
+def topological_sort_induced_flow_dag(G: Graph, flow: Sequence[int]) -> list[Vertex]:
+    """
+    Topologically sorts the graph of the edges with flow, without its cycles.
+    """
+    edges = [G.E[i] for i, f in enumerate(flow) if f > 0]
+    vertices: set[Vertex] = set()
+    for u, v in edges:
+        vertices.add(u)
+        vertices.add(v)
+
+    return topological_sort_with_backwards_edges(Graph(list(vertices), edges, []))[0]
+
+
+def hierarchy_level_weights(
+    hierarchy: Sequence[Collection[tuple[Vertex, Vertex]]],
+    level_weights: Sequence[int] | None = None,
+) -> Callable[[Graph], npt.NDArray[np.int64]]:
+    """
+    Weighs every edge by the first level of the expander hierarchy containing
+    it, as an (u, v) pair in either direction. level_weights gives the weight
+    of every level, and then of the edges in no level, 1, 2, ... unless given.
+    """
+    if level_weights is None:
+        level_weights = range(1, len(hierarchy) + 2)
+    assert len(level_weights) == len(hierarchy) + 1, "Expected a weight per level"
+    return vectorised(partial(_hierarchy_level_weights, hierarchy, level_weights))
+
+
+def _hierarchy_level_weights(
+    hierarchy: Sequence[Collection[tuple[Vertex, Vertex]]],
+    level_weights: Sequence[int],
+    G: Graph,
+) -> npt.NDArray[np.int64]:
+    # Pairs of vertex indices as single integers, so membership is vectorised
+    index, n = G.csr.index, G.csr.n
+    u, v = edge_ends(G)
+    keys, reverse_keys = u * n + v, v * n + u
+
+    levels = np.full(G.csr.m, len(hierarchy), dtype=np.int64)
+    for level in reversed(range(len(hierarchy))):
+        level_keys = [
+            index[a] * n + index[b]
+            for a, b in hierarchy[level]
+            if a in index and b in index
+        ]
+        in_level = np.isin(keys, level_keys) | np.isin(reverse_keys, level_keys)
+        levels[in_level] = level
+
+    return np.asarray(level_weights, dtype=np.int64)[levels]
+
+
+def condensation_weights(
+    intra_weight: int = 1,
+) -> Callable[[Graph], npt.NDArray[np.int64]]:
+    """
+    Weighs the edges of G by its strongly connected components, as a cheap
+    stand-in for an expander hierarchy. Edges inside a component get
+    intra_weight, and edges between components the distance between them in
+    a topological sort of the condensation.
+    """
+    return vectorised(partial(_condensation_weights, intra_weight))
+
+
+def _condensation_weights(intra_weight: int, G: Graph) -> npt.NDArray[np.int64]:
+    components = strongly_connected_components(G)
+    u, v = edge_ends(G)
+    return np.where(
+        components[u] == components[v],
+        intra_weight,
+        components[v] - components[u],
+    )
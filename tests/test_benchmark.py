@@ -0,0 +1,143 @@
+import time
+from typing import cast
+
+import pytest
+
+from src import benchmark
+
+
+def test_counters_are_noops_without_benchmark():
+    benchmark.clear()
+
+    benchmark.set_bench_scope("scope")
+    benchmark.count_s("counter")
+    benchmark.register_or_update_s("updated", 1, lambda x: x + 1)
+    benchmark.register_s("value", 1)
+
+    assert not benchmark.active
+    assert benchmark.bench_info == {}
+    assert benchmark.get_or_default_s("counter", 0) is None
+
+
+def test_count_s():
+    benchmark.clear()
+    benchmark.start_benchmark("test")
+    benchmark.set_bench_scope("scope")
+
+    assert benchmark.active
+
+    benchmark.count_s("counter")
+    benchmark.count_s("counter", 4)
+    benchmark.count_s("nested.counter")
+
+    assert benchmark.get_or_default_s("counter", 0) == 5
+    assert benchmark.results()["test"]["scope"] == {
+        "counter": 5,
+        "nested": {"counter": 1},
+    }
+
+    benchmark.clear()
+    assert not benchmark.active
+
+
+def test_counter_slots():
+    slot = benchmark.counter("scope.slot")
+    assert benchmark.counter("scope.slot") == slot
+    unused = benchmark.counter("scope.unused")
+
+    benchmark.clear()
+    benchmark.start_benchmark("first")
+    benchmark.counts[slot] += 2
+    benchmark.end_benchmark()
+
+    benchmark.start_benchmark("second")
+    benchmark.counts[slot] += 3
+    benchmark.counts[unused] += 0
+
+    # Counters live in a flat list until the results are put together
+    assert "slot" not in benchmark.bench_info["first"].get("scope", {})
+
+    results = benchmark.results()
+    assert results["first"]["scope"] == {"slot": 2}
+    assert results["second"]["scope"] == {"slot": 3}
+
+    benchmark.clear()
+
+
+def test_timed_scopes():
+    benchmark.clear()
+
+    @benchmark.timed("inner")
+    def inner():
+        time.sleep(0.01)
+
+    # Not recorded without a benchmark
+    inner()
+    assert benchmark.bench_timings == {}
+
+    benchmark.start_benchmark("test")
+    with benchmark.timed("outer"):
+        inner()
+        inner()
+    with benchmark.timed("outer"):
+        pass
+
+    outer = benchmark.results()["test"]["timing"]["outer"]
+    benchmark.clear()
+
+    assert isinstance(outer, dict)
+    assert outer["calls"] == 2
+    children = outer["children"]
+    assert isinstance(children, dict)
+    inner_timing = children["inner"]
+    assert isinstance(inner_timing, dict)
+    assert inner_timing["calls"] == 2
+    assert "children" not in inner_timing
+
+    cumulative_s = cast(float, outer["cumulative_s"])
+    self_s = cast(float, outer["self_s"])
+    assert cast(float, inner_timing["cumulative_s"]) >= 0.02
+    assert cumulative_s >= 0.02
+    assert self_s == pytest.approx(
+        cumulative_s - cast(float, inner_timing["cumulative_s"])
+    )
+
+
+def test_recursive_timed_scopes():
+    benchmark.clear()
+
+    @benchmark.timed("recursive")
+    def recursive(depth: int):
+        time.sleep(0.01)
+        if depth > 1:
+            recursive(depth - 1)
+
+    benchmark.start_benchmark("test")
+    recursive(3)
+    outer = benchmark.results()["test"]["timing"]["recursive"]
+    benchmark.clear()
+
+    # Every call keeps its own entry time, so the outer call covers the others
+    timings = []
+    while isinstance(outer, dict):
+        timings.append(cast(float, outer["cumulative_s"]))
+        outer = cast(dict[str, object], outer.get("children", {})).get("recursive")
+    assert len(timings) == 3
+    assert timings[0] >= 0.03
+    assert timings == sorted(timings, reverse=True)
+
+
+def test_sampled_scopes(monkeypatch: pytest.MonkeyPatch):
+    benchmark.clear()
+    monkeypatch.setattr(benchmark, "sampling_interval_s", 0.001)
+
+    benchmark.start_benchmark("test")
+    with benchmark.timed("sampled"):
+        time.sleep(0.05)
+    sampled = benchmark.results()["test"]["timing"]["sampled"]
+    benchmark.clear()
+
+    assert isinstance(sampled, dict)
+    assert sampled["calls"] == 1
+    assert cast(int, sampled["samples"]) > 0
+    assert sampled["cumulative_s"] == sampled["self_s"]
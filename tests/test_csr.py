@@ -0,0 +1,138 @@
+import pytest
+
+from src.utils import Graph, InducedSubgraph, export_russian_graph, remove_cycles
+
+
+def test_csr_arcs_match_edges():
+    G = Graph(
+        V=[0, 1, 2, 3],
+        E=[(0, 1), (1, 2), (0, 2), (2, 3), (1, 2)],  # Parallel edge (1, 2)
+        c=[4, 3, 2, 5, 1],
+    )
+    csr = G.csr
+
+    assert csr.n == 4 and csr.m == 5
+    assert csr.offsets.tolist() == [0, 2, 5, 9, 10]
+
+    for a in range(2 * csr.m):
+        i = csr.edge_ids[a]
+        u, v = G.E[i]
+        r = csr.reverse[a]
+
+        assert csr.reverse[r] == a
+        assert csr.edge_ids[r] == i
+        assert csr.forward[a] != csr.forward[r]
+        assert csr.capacities[a] == G.c[i]
+        assert csr.offsets[csr.tails[a]] <= a < csr.offsets[csr.tails[a] + 1]
+
+        if csr.forward[a]:
+            assert (csr.tails[a], csr.targets[a]) == (u, v)
+            assert csr.edge_arcs[i] == a
+        else:
+            assert (csr.tails[a], csr.targets[a]) == (v, u)
+
+
+def test_csr_edges_round_trip():
+    G = Graph(V=[7, 3, 5], E=[(7, 3), (3, 5), (5, 7)], c=[1, 2, 3])
+
+    assert G.csr.index == {7: 0, 3: 1, 5: 2}
+    assert G.csr.vertices.tolist() == [7, 3, 5]
+
+    for a in range(2 * G.csr.m):
+        e = G.edge(a)
+        assert G.arc(e) == a
+        assert e in G.outgoing[e.start()]
+        assert e in G.incoming[e.end()]
+
+    assert [G.volume(v) for v in G.V] == [2, 2, 2]
+    assert [G.volume_c(v) for v in G.V] == [4, 3, 5]
+
+
+def test_induced_subgraph_matches_graph():
+    G = Graph(
+        V=[6, 2, 4, 0, 5],
+        E=[(6, 2), (2, 4), (4, 0), (0, 6), (2, 0), (5, 6), (4, 2)],
+        c=[1, 2, 3, 4, 5, 6, 7],
+    )
+    H = InducedSubgraph(G, {0, 2, 4})
+    expected = Graph(V=[2, 4, 0], E=[(2, 4), (4, 0), (2, 0), (4, 2)], c=[2, 3, 5, 7])
+
+    assert H.V == expected.V
+    assert H.E == expected.E
+    assert H.c == expected.c
+    assert H.edge_ids.tolist() == [1, 2, 4, 6]
+    for name in (
+        "vertices",
+        "offsets",
+        "tails",
+        "targets",
+        "capacities",
+        "reverse",
+        "edge_ids",
+        "forward",
+        "edge_arcs",
+    ):
+        assert getattr(H.csr, name).tolist() == getattr(expected.csr, name).tolist()
+    assert H.csr.index == expected.csr.index
+
+    # Edges keep their ids in G
+    for a in range(2 * H.csr.m):
+        e = H.edge(a)
+        assert e == G.edge(G.arc(e))
+        assert H.arc(e) == a
+        assert e in H.outgoing[e.start()]
+    assert H._all_edges() <= G._all_edges()
+
+    # Edges of G which are not in the view
+    for i in (0, 3, 5):
+        e = G.edge(G.csr.edge_arcs[i])
+        with pytest.raises(KeyError):
+            _ = H.arc(e)
+    with pytest.raises(KeyError):
+        _ = InducedSubgraph(G, {0, 2}).arc(G.edge(G.csr.edge_arcs[6]))
+    assert [H.volume(v) for v in H.V] == [3, 3, 2]
+
+
+def test_induced_subgraph_of_view():
+    G = Graph(
+        V=[6, 2, 4, 0, 5],
+        E=[(6, 2), (2, 4), (4, 0), (0, 6), (2, 0), (5, 6), (4, 2)],
+        c=[1, 2, 3, 4, 5, 6, 7],
+    )
+    H = InducedSubgraph(G, {0, 2, 4, 6})
+    K = InducedSubgraph(H, {4, 0})
+
+    assert K.root is G
+    assert K.V == [4, 0]
+    assert K.E == [(4, 0)]
+    assert K.c == [3]
+    assert [K.edge(a).id for a in range(2 * K.csr.m)] == [3, -3]
+
+    vertices, edges = K.indices_in(H)
+    assert [H.V[x] for x in vertices] == K.V
+    assert [H.E[i] for i in edges] == K.E
+    vertices, edges = K.indices_in(G)
+    assert [G.V[x] for x in vertices] == K.V
+    assert [G.E[i] for i in edges] == K.E
+
+
+def test_induced_subgraph_capacities():
+    G = Graph(
+        V=[6, 2, 4, 0, 5],
+        E=[(6, 2), (2, 4), (4, 0), (0, 6), (2, 0), (5, 6), (4, 2)],
+        c=[1, 2, 3, 4, 5, 6, 7],
+    )
+    H = InducedSubgraph(G, {0, 2, 4})
+
+    # c is indexed like E, so code written against Graph works on views
+    assert len(H.c) == len(H.E)
+    assert export_russian_graph(H, 2, 0).splitlines() == [
+        "3 4 2 0",
+        "2-(2)>4",
+        "4-(3)>0",
+        "2-(5)>0",
+        "4-(7)>2",
+    ]
+    acyclic, removed = remove_cycles(H)
+    assert removed == {(4, 2)}
+    assert (acyclic.E, acyclic.c) == ([(2, 4), (4, 0), (2, 0)], [2, 3, 5])
@@ -1,5 +1,5 @@
-from src.expander_decomposition import expander_decomposition
-from src.utils import Edge, parse_input
+from src.expander_decomposition import expander_decomposition, select_sources_and_sinks
+from src.utils import Edge, Graph, InducedSubgraph, parse_input
 from tests.known_inputs import INPUT_EXPECTED
 from tests.utils import input_expected_list_to_params
 import pytest
@@ -44,3 +44,65 @@ def test_expander_decomposition_known_inputs_dag(input: str, expected: int):
     print("cut", cut)
 
     assert len(cut) != 0
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize("warm_start", [False, True])
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_expander_decomposition_processes(input: str, expected: int, warm_start: bool):
+    G, sources, sinks = parse_input(input, expected)
+    I = (
+        G,
+        G.c,
+        {v: sources[i] for i, v in enumerate(G.V)},
+        {v: sinks[i] for i, v in enumerate(G.V)},
+    )
+    F = G._all_edges()
+
+    try:
+        sequential = expander_decomposition(
+            I, kappa=10, F=F, H={}, phi=0.2, warm_start=warm_start
+        )
+    except ValueError:
+        # Some component has no sinks, see select_sources_and_sinks
+        with pytest.raises(ValueError):
+            _ = expander_decomposition(
+                I, kappa=10, F=F, H={}, phi=0.2, warm_start=warm_start, processes=2
+            )
+        return
+
+    parallel = expander_decomposition(
+        I, kappa=10, F=F, H={}, phi=0.2, warm_start=warm_start, processes=2
+    )
+
+    assert parallel == sequential
+
+
+def test_select_sources_and_sinks():
+    G = Graph(
+        V=[0, 1, 2, 3, 4],
+        E=[(0, 1), (0, 2), (1, 2), (3, 2), (3, 4), (2, 4), (3, 1)],
+        c=[1, 2, 3, 4, 5, 6, 7],
+    )
+
+    # 3 has the largest out-degree, and 2 the largest in-degree
+    sources, sinks = select_sources_and_sinks(G)
+    assert sources == {3: 16}
+    assert sinks == {2: 15}
+
+    # Every vertex of the cycle is a source
+    H = InducedSubgraph(
+        Graph(V=[5, 6, 7], E=[(5, 6), (6, 7), (7, 5)], c=[1, 2, 3]), {5, 6, 7}
+    )
+    sources, sinks = select_sources_and_sinks(H)
+    assert sources == {6: 3, 7: 5}
+    assert sinks == {5: 4, 6: 3, 7: 5}
+
+    # Every vertex is a source, but their in-degrees differ
+    H = Graph(
+        V=[5, 6, 7], E=[(5, 6), (5, 7), (6, 7), (6, 5), (7, 6), (7, 6)], c=[1] * 6
+    )
+    with pytest.raises(ValueError):
+        _ = select_sources_and_sinks(H)
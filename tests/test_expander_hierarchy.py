@@ -7,7 +7,8 @@ import src.benchmark as benchmark
 from src.weighted_push_relabel import weighted_push_relabel
 from .scripts.expander_hierarchy_generator import from_json_file
 import pytest
-from src.utils import Edge, export_russian_graph, parse_input
+from src.utils import export_russian_graph, parse_input
+from src.weights import topological_rank_weights
 
 from tests.utils import bench, run_test
 from .test_weighted_push_relabel import (
@@ -71,10 +72,7 @@ class ExpanderHierarchy(Base):
         dag_edges = expander_hierarchy.hierarchy[0]
         benchmark.register("blik.dag_edges_count", len(dag_edges))
 
-        ranks = {v: i for i, v in enumerate(expander_hierarchy.order)}
-
-        def weight_fn(e: Edge):
-            return abs(ranks[e.v] - ranks[e.u])
+        weight_fn = topological_rank_weights(expander_hierarchy.order)
 
         g, sources, sinks = parse_input(input, expected)
         h = len(g.V)
@@ -0,0 +1,63 @@
+import random
+
+from src.link_cut_tree import INF, LinkCutTree
+
+
+class NaiveForest:
+    def __init__(self, n: int):
+        self.parent = [-1] * n
+        self.value: list[float] = [INF] * n
+        self.weight = [0] * n
+
+    def path(self, x: int) -> list[int]:
+        vertices = [x]
+        while self.parent[vertices[-1]] != -1:
+            vertices.append(self.parent[vertices[-1]])
+        return vertices
+
+
+def test_link_cut_tree_matches_naive_forest():
+    rng = random.Random(1234)
+    n = 40
+
+    tree = LinkCutTree(n)
+    naive = NaiveForest(n)
+
+    for _ in range(5_000):
+        x = rng.randrange(n)
+        path = naive.path(x)
+        edges = path[:-1]
+
+        assert tree.find_root(x) == path[-1]
+        assert tree.path_length(x) == len(edges)
+        assert tree.path_weight(x) == sum(naive.weight[y] for y in edges)
+        assert tree.path(x) == path
+
+        op = rng.randrange(4)
+        if op == 0 and naive.parent[x] == -1:
+            y = rng.randrange(n)
+            if x not in naive.path(y):
+                value, weight = rng.randrange(1, 10), rng.randrange(1, 5)
+                tree.link(x, y, value, weight)
+                naive.parent[x] = y
+                naive.value[x] = value
+                naive.weight[x] = weight
+        elif op == 1 and naive.parent[x] != -1:
+            assert tree.cut(x) == naive.value[x]
+            naive.parent[x] = -1
+            naive.value[x] = INF
+            naive.weight[x] = 0
+        elif op == 2 and edges:
+            delta = rng.randrange(-2, 3)
+            if min(naive.value[y] for y in edges) + delta >= 0:
+                tree.path_add(x, delta)
+                for y in edges:
+                    naive.value[y] += delta
+        elif op == 3 and edges:
+            m, y = tree.path_min(x)
+            assert m == min(naive.value[z] for z in edges)
+            assert y == next(z for z in edges if naive.value[z] == m)
+
+        for y in range(n):
+            if naive.parent[y] != -1:
+                assert tree.get_value(y) == naive.value[y]
@@ -0,0 +1,54 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from src.utils import load_input, parse_input, read_edge_list
+
+INPUT = """5 5 10 40
+10-(3)>20
+20-(4)>20
+20-(5)>40
+10-(6)>30
+30-(7)>40
+"""
+
+
+def test_parse_input():
+    G, sources, sinks = parse_input(INPUT, 8)
+
+    # The self-loop is dropped and the vertices remapped to 0..n-1
+    assert G.V == [0, 1, 2, 3]
+    assert G.E == [(0, 1), (1, 3), (0, 2), (2, 3)]
+    assert G.c == [3, 5, 6, 7]
+    assert sources == [8, 0, 0, 0]
+    assert sinks == [0, 0, 0, 8]
+
+
+def test_read_edge_list_in_chunks():
+    # Chunks which end in the middle of a line
+    edges = read_edge_list(io.BytesIO(INPUT.encode()), chunk_size=7)
+
+    assert (edges.n, edges.m, edges.s, edges.t) == (5, 5, 10, 40)
+    assert edges.tails.tolist() == [10, 20, 20, 10, 30]
+    assert edges.heads.tolist() == [20, 20, 40, 30, 40]
+    assert edges.capacities.tolist() == [3, 4, 5, 6, 7]
+
+
+def test_load_input_from_file(tmp_path: Path):
+    path = tmp_path / "input.txt"
+    _ = path.write_text(INPUT)
+
+    G, sources, sinks = parse_input(INPUT, 8)
+    for source in (path, str(path), io.BytesIO(INPUT.encode())):
+        H, _sources, _sinks = load_input(source, 8)
+        assert (H.V, H.E, H.c) == (G.V, G.E, G.c)
+        assert (_sources, _sinks) == (sources, sinks)
+
+
+def test_malformed_input():
+    with pytest.raises(ValueError):
+        _ = parse_input("2 1 0 1\n0-(3)-1", 1)
+
+    with pytest.raises(ValueError):
+        _ = parse_input("3 1 0 2\n0-(3)>1", 1)
@@ -1,6 +1,12 @@
 from itertools import chain
-from src.sparse_cut import sparse_cut
-from src.utils import parse_input
+import sys
+
+import networkx as nx
+
+from src import benchmark
+from src.sparse_cut import ShortestPaths, dial, dijsktra, sparse_cut, zero_one_bfs
+from src.utils import Graph, InducedSubgraph, arc_id, arc_id_mask, arc_ids, parse_input
+from src.weighted_push_relabel import WeightedPushRelabel
 from tests.known_inputs import INPUT_EXPECTED
 from tests.utils import input_expected_list_to_params
 import pytest
@@ -45,3 +51,175 @@ def test_sparse_cut_known_inputs_dag(input: str, expected: int):
     print("cut", cut)
 
     assert flow is not None
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.sparse_cut
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+@pytest.mark.parametrize(
+    "shortest_paths,max_w", [(dijsktra, 3), (dial, 3), (dial, 1), (zero_one_bfs, 1)]
+)
+def test_shortest_paths_match_networkx(
+    input: str, expected: int, shortest_paths: ShortestPaths, max_w: int
+):
+    G, sources, sinks = parse_input(input, expected)
+    instance = WeightedPushRelabel(
+        G,
+        G.c,
+        {v: sources[i] for i, v in enumerate(G.V)},
+        {v: sinks[i] for i, v in enumerate(G.V)},
+        lambda _: 1,
+        len(G.V),
+    )
+    _ = instance.solve()
+
+    csr = G.csr
+    w_f = [a % (max_w + 1) for a in range(2 * csr.m)]
+    S_0 = list(range(0, csr.n, 3))
+
+    residual = nx.DiGraph()
+    residual.add_nodes_from(range(csr.n))
+    for a in range(2 * csr.m):
+        u, v = instance.tails[a], instance.targets[a]
+        if instance.c_f(a) > 0 and (
+            not residual.has_edge(u, v) or residual[u][v]["weight"] > w_f[a]
+        ):
+            residual.add_edge(u, v, weight=w_f[a])
+    distances = nx.multi_source_dijkstra_path_length(residual, set(S_0))
+
+    levels = shortest_paths(G, instance, S_0, w_f)
+    for level, vertices in levels.items():
+        for x in vertices:
+            assert distances.get(x, sys.maxsize) == level
+    assert sum(len(vertices) for vertices in levels.values()) == csr.n
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.sparse_cut
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_sparse_cut_edges_cross_cut(input: str, expected: int):
+    G, *_ = parse_input(input, expected)
+    _, (S, S_complement, edges) = run_sparse_cut(input, expected, kappa=1)
+
+    if len(S) == 0 and len(S_complement) == 0:
+        assert len(edges) == 0
+        return
+
+    assert S | S_complement == set(G.V)
+    assert S.isdisjoint(S_complement)
+    for e in edges:
+        assert (e.u in S) != (e.v in S)
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.sparse_cut
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_sparse_cut_arc_id_mask(input: str, expected: int):
+    G, sources, sinks = parse_input(input, expected)
+    H = InducedSubgraph(G, G.V[: len(G.V) * 2 // 3 + 1])
+    F = {e for e in G._all_edges() if e.id % 2 == 0}
+
+    def run(F):
+        return sparse_cut(
+            I=(
+                H,
+                H.c,
+                {v: sources[i] for i, v in enumerate(G.V) if v in H.csr.index},
+                {v: sinks[i] for i, v in enumerate(G.V) if v in H.csr.index},
+            ),
+            kappa=1,
+            F=F,
+            H={},
+            phi=0.2,
+        )
+
+    # The mask of the whole graph works for the view too
+    assert run(arc_id_mask(G, F)) == run(F)
+
+    # Views look up the arcs of their root
+    assert arc_ids(H).tolist() == [arc_id(H.edge(a)) for a in range(2 * H.csr.m)]
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.sparse_cut
+def test_sparse_cut_vol_F_by_direction():
+    # One unit of flow saturates 0 -> 1 -> 2, leaving only their backward arcs
+    G = Graph(V=[0, 1, 2, 3], E=[(0, 1), (1, 2), (0, 3)], c=[1, 1, 5])
+    forward = {G.edge(a) for a in G.csr.edge_arcs.tolist()}
+
+    def vol(F):
+        benchmark.clear()
+        benchmark.start_benchmark("test")
+        _ = sparse_cut(I=(G, G.c, {0: 2}, {2: 2}), kappa=1, F=F, H={}, phi=0.2)
+        levels = benchmark.results()["test"]["sparse_cut"]["levels"]
+        benchmark.clear()
+        return [(level["vol_S"], level["vol_S_complement"]) for level in levels]
+
+    # Only the residual arcs in F count, so the backward arcs do with both
+    # directions but not with the forward edges alone
+    assert vol(forward) == [(1, 1)]
+    assert vol(set(G._all_edges())) == [(2, 4)]
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.sparse_cut
+def test_sparse_cut_records_levels_quietly(capsys: pytest.CaptureFixture[str]):
+    benchmark.clear()
+    benchmark.start_benchmark("test")
+    for input, expected, _ in INPUT_EXPECTED:
+        _ = run_sparse_cut(input, expected, kappa=1)
+    levels = benchmark.results()["test"]["sparse_cut"]["levels"]
+    benchmark.clear()
+
+    assert capsys.readouterr().out == ""
+
+    assert isinstance(levels, list) and len(levels) > 0
+    for level in levels:
+        assert isinstance(level, dict)
+        assert level["value"] == level["capacity"] - min(
+            level["vol_S"], level["vol_S_complement"]
+        )
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.sparse_cut
+def test_sparse_cut_arc_weights():
+    G = Graph(V=[0, 1, 2, 3], E=[(0, 1), (1, 2), (0, 3)], c=[1, 1, 5])
+    # The forward arc of edge 1 and the backward arc of edge 2
+    F = {G.edge(0), G.edge(4)}
+    D_H = {G.edge(a) for a in range(2 * G.csr.m) if abs(G.edge(a).id) == 3}
+    w_H = [2, 3, 5]
+    recorded: list[list[int]] = []
+
+    def shortest_paths(G, instance, S_0, w_f):
+        recorded.append(w_f)
+        return dijsktra(G, instance, S_0, w_f)
+
+    _ = sparse_cut(
+        I=(G, G.c, {0: 2}, {2: 2}),
+        kappa=1,
+        F=F,
+        H={0: D_H},
+        phi=0.2,
+        w_H=w_H,
+        shortest_paths=shortest_paths,
+    )
+
+    # w_f is n on F, 0 on the forward arcs of D_H and w_H everywhere else
+    expected = []
+    for a in range(2 * G.csr.m):
+        e = G.edge(a)
+        if e in D_H and e.forward:
+            expected.append(0)
+        elif e in F:
+            expected.append(len(G.V))
+        else:
+            expected.append(w_H[abs(e.id) - 1])
+    assert recorded == [expected]
+    assert expected == [4, 0, 2, 3, 4, 5]
@@ -1,4 +1,18 @@
-from src.utils import Graph, topological_sort_with_backwards_edges
+import sys
+from collections import defaultdict
+
+import pytest
+
+from src.utils import (
+    Graph,
+    Vertex,
+    load_input,
+    strongly_connected_components,
+    topological_sort,
+    topological_sort_with_backwards_edges,
+)
+from tests.large_inputs import DAG_INPUT_EXPECTED
+from tests.utils import input_expected_list_to_params
 
 
 def test_backwards_edges_are_handled():
@@ -92,3 +106,84 @@ def test_codepath_example():
     assert backwards_edges == set(), (
         f"Expected backwards edges to be [], got {backwards_edges}"
     )
+
+
+def test_every_cycle_is_broken():
+    # The search from 3 reaches the cycle 1 -> 2 -> 1 before the edge 1 -> 3
+    G = Graph(V=[3, 1, 2], E=[(3, 1), (1, 2), (2, 1), (1, 3)], c=[1, 1, 1, 1])
+
+    order, backwards_edges = topological_sort_with_backwards_edges(G)
+
+    assert order == [3, 1, 2]
+    assert backwards_edges == {(2, 1), (1, 3)}
+
+
+def test_long_path_does_not_recurse():
+    n = 20_000
+    G = Graph(
+        V=list(range(n)), E=[(i, i + 1) for i in range(n - 1)] + [(n - 1, 0)], c=[]
+    )
+
+    order, backwards_edges = topological_sort_with_backwards_edges(G)
+
+    assert order == list(range(n))
+    assert backwards_edges == {(n - 1, 0)}
+
+
+def test_successors_in_set_order():
+    # A set iterates {9, 1} as 9, 1, which the old recursive search followed
+    G = Graph(V=[0, 9, 1], E=[(0, 9), (0, 1)], c=[])
+
+    assert topological_sort(G) == [0, 1, 9]
+
+
+def recursive_topological_sort(G: Graph) -> list[Vertex]:
+    """
+    The old recursive topological sort over a set-based adjacency.
+    """
+    adj: dict[Vertex, set[Vertex]] = defaultdict(set)
+    for u, v in G.E:
+        adj[u].add(v)
+
+    visited: set[Vertex] = set()
+    sorted_vertices: list[Vertex] = []
+
+    def dfs(v: Vertex):
+        visited.add(v)
+        for w in adj[v]:
+            if w not in visited:
+                dfs(w)
+        sorted_vertices.append(v)
+
+    for v in G.V:
+        if v not in visited:
+            dfs(v)
+
+    return sorted_vertices[::-1]
+
+
+@pytest.mark.parametrize(
+    "path,expected", input_expected_list_to_params(DAG_INPUT_EXPECTED)
+)
+def test_same_order_as_recursive_search(path: str, expected: int):
+    G, _, _ = load_input(path, expected)
+    assert len(G.V) < sys.getrecursionlimit()
+
+    order, backwards_edges = topological_sort_with_backwards_edges(G)
+
+    assert topological_sort(G) == recursive_topological_sort(G)
+    assert order == recursive_topological_sort(G)
+    assert backwards_edges == set()
+
+
+def test_strongly_connected_components():
+    # Two cycles joined by an edge, and a vertex hanging off each of them
+    G = Graph(
+        V=[0, 1, 2, 3, 4, 5, 6],
+        E=[(6, 0), (0, 1), (1, 2), (2, 0), (2, 3), (3, 4), (4, 3), (4, 5)],
+        c=[],
+    )
+
+    components = strongly_connected_components(G).tolist()
+
+    assert components == [1, 1, 1, 2, 2, 3, 0]
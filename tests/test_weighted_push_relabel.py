@@ -1,60 +1,81 @@
+from functools import partial
 import os
+from pathlib import Path
 import typing
 import pytest
 from src.weighted_push_relabel import weighted_push_relabel
 from tests import known_inputs, large_inputs, random_inputs
 from tests.utils import (
+    Input,
     bench,
+    input_size,
     parse_maxflow_file_names,
     run_test,
     run_test_with_flow_weight,
+    run_test_with_scc_weight,
     run_test_with_topsort,
     wrap_correct,
 )
 
-type InputExpected = list[tuple[str, int, str]]
-
-
-def read_file(file: str) -> str:
-    with open(file, "r") as f:
-        return f.read()
+type InputExpected = list[tuple[Input, int, str]]
 
 
 class Base:
     file_based: bool = False
-    params: list[tuple[str, int, str]] = []
+    params: InputExpected = []
 
     @pytest.mark.weighted_push_relabel
     @bench
-    def test_weighted_push_relabel(self, input: str, expected: int):
-        n = int(input.split()[0])
+    def test_weighted_push_relabel(self, input: Input, expected: int):
+        n = input_size(input)
         run_test(input, expected, weighted_push_relabel, h=2 * (n / 9))
 
+    @pytest.mark.weighted_push_relabel
+    @bench
+    def test_weighted_push_relabel_with_dynamic_trees(
+        self, input: Input, expected: int
+    ):
+        n = input_size(input)
+        run_test(
+            input,
+            expected,
+            partial(weighted_push_relabel, dynamic_trees=True),
+            h=2 * (n / 9),
+        )
+
     @pytest.mark.weighted_push_relabel
     @pytest.mark.with_n_weight
     @bench
-    def test_weighted_push_relabel_with_n_weight(self, input: str, expected: int):
-        n = int(input.split()[0])
+    def test_weighted_push_relabel_with_n_weight(self, input: Input, expected: int):
+        n = input_size(input)
         run_test(input, expected, weighted_push_relabel, weight_fn=lambda x: n)
 
     # @pytest.mark.weighted_push_relabel
     # @bench
-    # def test_weighted_push_relabel_with_2_weight(self, input: str, expected: int):
+    # def test_weighted_push_relabel_with_2_weight(self, input: Input, expected: int):
     #     run_test(input, expected, weighted_push_relabel, weight_fn=lambda _: 2)
 
     @pytest.mark.weighted_push_relabel
     @pytest.mark.with_flow_weight
     @bench
-    def test_weighted_push_relabel_with_flow_weight(self, input: str, expected: int):
+    def test_weighted_push_relabel_with_flow_weight(self, input: Input, expected: int):
         run_test_with_flow_weight(input, expected, weighted_push_relabel)
 
+    @pytest.mark.weighted_push_relabel
+    @pytest.mark.with_scc_weight
+    @bench
+    def test_weighted_push_relabel_with_scc_weight(self, input: Input, expected: int):
+        run_test_with_scc_weight(input, expected, weighted_push_relabel)
+
     @pytest.mark.correct_flow
     @bench
-    def test_correct_flow_algorithms(self, input: str, expected: int):
+    def test_correct_flow_algorithms(self, input: Input, expected: int):
         run_test(input, expected, wrap_correct)
 
 
-def create_test_params(class_instance: Base) -> tuple[list[tuple[str, int]], list[str]]:
+def create_test_params(
+    class_instance: Base,
+) -> tuple[list[tuple[Input, int]], list[str]]:
     params = class_instance.params
     if not params:
         raise ValueError(
@@ -65,10 +86,11 @@ def create_test_params(class_instance: Base) -> tuple[list[tuple[str, int]], lis
         for i, param in enumerate(params):
             input, expected, id = param
 
-            params[i] = (read_file(input), expected, id)
+            # Only read when the test runs
+            params[i] = (Path(input), expected, id)
         class_instance.file_based = False
 
-    in_ex_dict: dict[str, tuple[str, int]] = {}
+    in_ex_dict: dict[str, tuple[Input, int]] = {}
     ids: list[str] = []
 
     for param in params:
@@ -76,7 +98,7 @@ def create_test_params(class_instance: Base) -> tuple[list[tuple[str, int]], lis
         in_ex_dict[id] = (input, expected)
         ids.append(id)
 
-    in_ex: list[tuple[str, int]] = []
+    in_ex: list[tuple[Input, int]] = []
     ids = sorted(ids)
     for id in ids:
         in_ex.append(in_ex_dict[id])
@@ -95,7 +117,7 @@ class TopSortable(Base):
     @pytest.mark.weighted_push_relabel
     @pytest.mark.with_top_sort
     @bench
-    def test_weighted_push_relabel_with_topsort(self, input: str, expected: int):
+    def test_weighted_push_relabel_with_topsort(self, input: Input, expected: int):
         run_test_with_topsort(input, expected, weighted_push_relabel)
 
 
@@ -0,0 +1,285 @@
+from collections.abc import Callable
+
+import pytest
+
+from src.utils import Edge, Graph, MinIndexedSet, next_multiple_of, parse_input
+from src.weighted_push_relabel import (
+    WarmStart,
+    WeightedPushRelabel,
+    weighted_push_relabel_batch,
+    weighted_push_relabel_dict,
+)
+from src.weights import topological_rank_weights
+from tests.known_inputs import INPUT_EXPECTED
+from tests.utils import input_expected_list_to_params
+
+
+def solved_instance(
+    input: str,
+    expected: int,
+    w: Callable[[Edge], int] = lambda _: 1,
+    warm_start: WarmStart | None = None,
+) -> WeightedPushRelabel:
+    G, sources, sinks = parse_input(input, expected)
+    instance = WeightedPushRelabel(
+        G,
+        G.c,
+        {v: sources[i] for i, v in enumerate(G.V)},
+        {v: sinks[i] for i, v in enumerate(G.V)},
+        w,
+        len(G.V),
+        warm_start=warm_start,
+    )
+    mf, _ = instance.solve()
+    assert mf == expected, f"Expected {expected}, got {mf}"
+
+    return instance
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_net_flow_matches_flow(input: str, expected: int):
+    instance = solved_instance(input, expected)
+    csr = instance.G.csr
+
+    for x in range(csr.n):
+        net = 0
+        for a in csr.out_arcs(x):
+            f_e = instance.f[csr.edge_ids[a]]
+            net += -f_e if csr.forward[a] else f_e
+
+        assert instance.net_flow(x) == net
+
+    for i, f_e in enumerate(instance.f):
+        assert 0 <= f_e <= instance.G.c[i]
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_no_admissible_out_edges_worklist(input: str, expected: int):
+    instance = solved_instance(input, expected)
+    worklist = instance.alive_vertices_with_no_admissible_out_edges
+
+    # solve only stops once every such saturated vertex has been relabeled
+    assert len(worklist.saturated) == 0
+
+    for x in range(instance.G.csr.n):
+        expected_in_worklist = (
+            x in instance.alive and len(instance.admissible_outgoing[x]) == 0
+        )
+        assert (x in worklist) == expected_in_worklist
+        if x in worklist.unsaturated:
+            assert instance.residual_sink(x) > 0
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_active_sources(input: str, expected: int):
+    instance = solved_instance(input, expected)
+
+    # solve only stops once no alive vertex has excess left
+    assert len(instance.active_sources) == 0
+    assert instance.find_alive_vertex_with_excess() is None
+    for x in instance.alive:
+        assert instance.residual_source(x) == 0
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_next_multiples(input: str, expected: int):
+    instance = solved_instance(input, expected, lambda e: 1 + abs(e.id) % 3)
+
+    for x in range(instance.G.csr.n):
+        weights = sorted(instance.weight_buckets[x])
+        assert sorted(weight for _, weight in instance.next_multiples[x]) == weights
+
+        if x in instance.alive:
+            for event, weight in instance.next_multiples[x]:
+                assert event == next_multiple_of(instance.l[x], weight)
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_warm_start_from_final_state(input: str, expected: int):
+    warm_start = WarmStart()
+    cold = solved_instance(input, expected, warm_start=warm_start)
+    assert warm_start.f == cold.f
+    assert warm_start.l == cold.l
+
+    warm = solved_instance(input, expected, warm_start=warm_start)
+    assert warm.f == cold.f
+    assert warm.l == cold.l
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_warm_start_cancels_flow_without_source(input: str, expected: int):
+    cold = solved_instance(input, expected)
+
+    # The same flow, but without any sources to send it
+    G = cold.G
+    instance = WeightedPushRelabel(
+        G, G.c, {}, cold.sinks, lambda _: 1, len(G.V), warm_start=WarmStart(cold.f)
+    )
+    mf, f = instance.solve()
+
+    assert mf == 0
+    for x in range(G.csr.n):
+        assert instance.net_flow(x) >= 0
+    for i, f_e in enumerate(f):
+        assert 0 <= f_e <= G.c[i]
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize("dynamic_trees", [False, True])
+def test_path_through_saturated_sink(dynamic_trees: bool):
+    # Once 1 is saturated, flow from 0 has to go on through it to 2
+    G = Graph(V=[0, 1, 2], E=[(0, 1), (1, 2)], c=[5, 5])
+
+    assert weighted_push_relabel_dict(
+        G, G.c, {0: 2}, {1: 1, 2: 2}, [1, 1], 3, dynamic_trees=dynamic_trees
+    ) == (2, [2, 1])
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize("dynamic_trees", [False, True])
+def test_sources_in_order(dynamic_trees: bool):
+    # The sink only has room for the flow of the first source
+    G = Graph(V=[0, 1, 2], E=[(0, 2), (1, 2)], c=[1, 1])
+
+    for sources, f in (({0: 1, 1: 1}, [1, 0]), ({1: 1, 0: 1}, [0, 1])):
+        _, flow = weighted_push_relabel_dict(
+            G, G.c, sources, {2: 1}, [1, 1], 3, dynamic_trees=dynamic_trees
+        )
+        assert flow == f
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize("dynamic_trees", [False, True])
+def test_saturated_vertices_in_order(dynamic_trees: bool):
+    # Taking the latest saturated vertex instead of the smallest routed no flow
+    # here with h = 1, while the maximum flow is 2
+    G = Graph(
+        V=list(range(8)),
+        E=[(6, 1), (7, 0), (3, 6), (1, 6), (6, 0), (4, 3), (7, 6), (5, 3), (7, 6)],
+        c=[3, 4, 5, 5, 3, 4, 3, 2, 3],
+    )
+    w = [1, 1, 3, 2, 2, 2, 1, 1, 1]
+
+    flow_value, _ = weighted_push_relabel_dict(
+        G, G.c, {5: 3}, {1: 4, 2: 6}, w, 1, dynamic_trees=dynamic_trees
+    )
+    assert flow_value == 2
+
+
+@pytest.mark.weighted_push_relabel
+def test_paths_follow_csr_order():
+    # trace_path follows the admissible arcs of a vertex in the order of the
+    # CSR. The sets of Edges before it followed them in another order, which
+    # sent the flow of source 1 around source 3 and returned 10 here, with the
+    # flow [1, 0, 0, 0, 0, 7, 0, 0, 2, 0, 1, 0, 0, 1, 7]. The value counts the
+    # flow out of every source, so the 2 units through 3 count twice now.
+    G = Graph(
+        V=list(range(6)),
+        E=[
+            (0, 2),
+            (0, 3),
+            (0, 5),
+            (1, 0),
+            (1, 3),
+            (1, 5),
+            (2, 0),
+            (2, 5),
+            (3, 2),
+            (3, 4),
+            (3, 5),
+            (4, 1),
+            (4, 3),
+            (5, 0),
+            (5, 2),
+        ],
+        c=[3, 4, 4, 1, 4, 7, 8, 8, 2, 1, 3, 9, 1, 1, 7],
+    )
+
+    sources = {v: {1: 7, 3: 6, 4: 6}.get(v, 0) for v in G.V}
+    sinks = {v: 10 if v == 2 else 0 for v in G.V}
+
+    assert weighted_push_relabel_dict(G, G.c, sources, sinks, lambda _: 1, 6) == (
+        12,
+        [1, 0, 0, 1, 2, 4, 0, 0, 2, 0, 3, 0, 0, 0, 7],
+    )
+
+
+def test_min_indexed_set():
+    items = MinIndexedSet(5, [3, 1, 4])
+    assert len(items) == 3 and items.min() == 1
+
+    items.discard(1)
+    items.discard(2)
+    assert 1 not in items and items.min() == 3
+
+    items.add(1)
+    items.add(0)
+    items.add(0)
+    assert len(items) == 4 and items.min() == 0
+
+
+def edge_weight(e: Edge) -> int:
+    return 1 + abs(e.id) % 3
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_matches_single_solves(input: str, expected: int, processes: int):
+    G, sources, sinks = parse_input(input, expected)
+    _sources = {v: sources[i] for i, v in enumerate(G.V)}
+    _sinks = {v: sinks[i] for i, v in enumerate(G.V)}
+
+    # Flow from the sinks to the sources, and from every vertex to every vertex
+    half = {v: G.volume_c(v) // 2 for v in G.V}
+    demands = [(_sources, _sinks), (_sinks, _sources), (half, half)]
+    hs = [len(G.V), len(G.V), 2]
+
+    results = weighted_push_relabel_batch(
+        G, G.c, demands, edge_weight, hs, processes=processes
+    )
+
+    assert results[0][0] == expected
+    for (sources, sinks), h, result in zip(demands, hs, results):
+        assert result == weighted_push_relabel_dict(
+            G, G.c, sources, sinks, edge_weight, h
+        )
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_batch_with_weight_provider(input: str, expected: int):
+    G, sources, sinks = parse_input(input, expected)
+    _sources = {v: sources[i] for i, v in enumerate(G.V)}
+    _sinks = {v: sinks[i] for i, v in enumerate(G.V)}
+    w = topological_rank_weights()
+
+    results = weighted_push_relabel_batch(
+        G, G.c, [(_sources, _sinks)], w, len(G.V), processes=2
+    )
+
+    assert results == [
+        weighted_push_relabel_dict(G, G.c, _sources, _sinks, w, len(G.V))
+    ]
@@ -0,0 +1,153 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src.utils import Edge, Graph, InducedSubgraph, parse_input
+from src.weighted_push_relabel import WeightedPushRelabel, weighted_push_relabel_dict
+from src.weights import (
+    condensation_weights,
+    constant_weights,
+    edge_weights,
+    flow_rank_weights,
+    hierarchy_level_weights,
+    topological_rank_weights,
+    vectorised,
+)
+from tests.known_inputs import INPUT_EXPECTED
+from tests.utils import input_expected_list_to_params
+
+
+def test_edge_weights():
+    G = Graph(V=[0, 1, 2, 3], E=[(0, 1), (1, 2), (2, 3), (3, 0)], c=[4, 3, 2, 1])
+    H = InducedSubgraph(G, {1, 2, 3})
+
+    def w(e: Edge) -> int:
+        return e.id * e.c
+
+    @vectorised
+    def w_vectorised(G: Graph) -> list[int]:
+        return [w(G.edge(a)) for a in G.csr.edge_arcs.tolist()]
+
+    for graph, expected in ((G, [4, 6, 6, 4]), (H, [6, 6])):
+        assert edge_weights(graph, w).tolist() == expected
+        assert edge_weights(graph, w_vectorised).tolist() == expected
+        assert edge_weights(graph, expected).tolist() == expected
+        assert edge_weights(graph, np.array(expected)).tolist() == expected
+
+
+@pytest.mark.weighted_push_relabel
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_weight_array_matches_callable(input: str, expected: int):
+    G, sources, sinks = parse_input(input, expected)
+    _sources = {v: sources[i] for i, v in enumerate(G.V)}
+    _sinks = {v: sinks[i] for i, v in enumerate(G.V)}
+
+    def w(e: Edge) -> int:
+        return 1 + abs(e.id) % 3
+
+    weights = [1 + (i + 1) % 3 for i in range(len(G.E))]
+    assert weighted_push_relabel_dict(
+        G, G.c, _sources, _sinks, weights, len(G.V)
+    ) == weighted_push_relabel_dict(G, G.c, _sources, _sinks, w, len(G.V))
+
+
+@pytest.mark.parametrize(
+    "input,expected", input_expected_list_to_params(INPUT_EXPECTED)
+)
+def test_weight_buckets(input: str, expected: int):
+    G, *_ = parse_input(input, expected)
+    instance = WeightedPushRelabel(G, G.c, {}, {}, lambda e: 1 + abs(e.id) % 3, 1)
+    instance.prepare()
+
+    for x in range(G.csr.n):
+        buckets = instance.weight_buckets[x]
+        assert list(buckets) == sorted(buckets)
+        assert sorted(a for arcs in buckets.values() for a in arcs) == list(
+            G.csr.out_arcs(x)
+        )
+        for weight, arcs in buckets.items():
+            assert arcs == sorted(arcs)
+            assert all(instance.arc_w[a] == weight for a in arcs)
+
+
+def test_weight_providers():
+    G = Graph(
+        V=[3, 1, 0, 2], E=[(0, 1), (1, 2), (0, 2), (2, 3), (1, 3)], c=[1, 1, 1, 1, 1]
+    )
+
+    assert edge_weights(G, constant_weights(4)).tolist() == [4] * 5
+
+    # 0, 1, 2, 3 is the only topological order
+    assert edge_weights(G, topological_rank_weights()).tolist() == [1, 1, 2, 1, 2]
+    order = [1, 0, 3, 2]
+    assert edge_weights(G, topological_rank_weights(order)).tolist() == [
+        1,
+        3,
+        2,
+        1,
+        2,
+    ]
+
+    # Flow along 0 -> 1 -> 3, the other edges get the default
+    flow = [1, 0, 0, 0, 1]
+    assert edge_weights(G, flow_rank_weights(flow)).tolist() == [1, 400, 400, 400, 1]
+    assert edge_weights(G, flow_rank_weights(flow, default=7)).tolist() == [
+        1,
+        7,
+        7,
+        7,
+        1,
+    ]
+
+    hierarchy = [{(0, 1), (3, 2)}, {(1, 2), (0, 1)}]
+    assert edge_weights(G, hierarchy_level_weights(hierarchy)).tolist() == [
+        1,
+        2,
+        3,
+        1,
+        3,
+    ]
+    assert edge_weights(G, hierarchy_level_weights(hierarchy, [5, 6, 0])).tolist() == [
+        5,
+        6,
+        0,
+        5,
+        0,
+    ]
+
+    # Views look up their edges by vertex
+    H = InducedSubgraph(G, {1, 2, 3})
+    assert edge_weights(H, hierarchy_level_weights(hierarchy)).tolist() == [2, 1, 3]
+    assert edge_weights(H, topological_rank_weights()).tolist() == [1, 1, 2]
+
+
+def test_weight_providers_pickle():
+    G = Graph(
+        V=[3, 1, 0, 2], E=[(0, 1), (1, 2), (0, 2), (2, 3), (1, 3)], c=[1, 1, 1, 1, 1]
+    )
+
+    # The providers go to worker processes with the process-parallel solvers
+    for w in (
+        constant_weights(4),
+        topological_rank_weights([1, 0, 3, 2]),
+        flow_rank_weights([1, 0, 0, 0, 1]),
+        hierarchy_level_weights([{(0, 1), (3, 2)}, {(1, 2), (0, 1)}]),
+        condensation_weights(5),
+    ):
+        w_copy = pickle.loads(pickle.dumps(w))
+        assert edge_weights(G, w_copy).tolist() == edge_weights(G, w).tolist()
+
+
+def test_condensation_weights():
+    G = Graph(
+        V=[0, 1, 2, 3, 4],
+        E=[(0, 1), (1, 0), (1, 2), (0, 4), (2, 3), (3, 2), (3, 4)],
+        c=[1, 1, 1, 1, 1, 1, 1],
+    )
+
+    # The components are {0, 1}, {2, 3} and {4} in that order
+    assert edge_weights(G, condensation_weights()).tolist() == [1, 1, 1, 2, 1, 1, 1]
+    assert edge_weights(G, condensation_weights(5)).tolist() == [5, 5, 1, 2, 5, 5, 1]
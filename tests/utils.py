@@ -1,8 +1,15 @@
 import os
+from pathlib import Path
 
 import pytest
 from src import benchmark
-from src.utils import Edge, Graph, parse_input, topological_sort
+from src.utils import Edge, Graph, load_input, parse_input
+from src.weights import (
+    Weights,
+    condensation_weights,
+    constant_weights,
+    topological_rank_weights,
+)
 from typing import Callable, ParamSpec, TypeVar
 from tests.flows import (
     make_test_flow_input,
@@ -14,6 +21,10 @@ from functools import wraps
 Param = ParamSpec("Param")
 RetType = TypeVar("RetType")
 
+# An input itself, or the path of a file containing it, which is only read
+# when the test runs
+type Input = str | Path
+
 
 def bench(
     func: Callable[Param, RetType],
@@ -42,7 +53,7 @@ def wrap_correct(
     _: list[int],
     sources: list[int],
     sinks: list[int],
-    w: Callable[[Edge], int],
+    w: Weights,
     h: int,
 ) -> tuple[int, dict[Edge, int] | None]:
     edges, capacities, s, t = make_test_flow_input(G, sources, sinks, w, h)
@@ -51,24 +62,38 @@ def wrap_correct(
 
 
 FlowFn = Callable[
-    [Graph, list[int], list[int], list[int], Callable[[Edge], int], int],
+    [Graph, list[int], list[int], list[int], Weights, int],
     tuple[int, dict[Edge, int] | None],
 ]
 
 
+def read_input(input: Input, expected: int) -> tuple[Graph, list[int], list[int]]:
+    if isinstance(input, Path):
+        return load_input(input, expected)
+    return parse_input(input, expected)
+
+
+def input_size(input: Input) -> int:
+    """
+    Returns the number of vertices in the header of input.
+    """
+    if isinstance(input, Path):
+        with open(input, "rb") as f:
+            return int(f.readline().split()[0])
+    return int(input.split()[0])
+
+
 def run_test(
-    input: str,
+    input: Input,
     expected: int,
     flow_fn: FlowFn,
-    weight_fn: Callable[[Edge], int] | None = None,  # type: ignore
+    weight_fn: Weights | None = None,
     h: int | None = None,
 ):
     if weight_fn is None:
+        weight_fn = constant_weights(1)
 
-        def weight_fn(e):
-            return 1
-
-    g, sources, sinks = parse_input(input, expected)
+    g, sources, sinks = read_input(input, expected)
 
     benchmark.register_or_update("bench_config.top_sort", False, lambda x: x)
 
@@ -78,33 +103,36 @@ def run_test(
 
 
 def run_test_with_topsort(
-    input: str,
+    input: Input,
     expected: int,
     flow_fn: FlowFn,
     h: int | None = None,
 ):
     benchmark.register("bench_config.top_sort", True)
 
-    g, *_ = parse_input(input, expected)
+    return run_test(input, expected, flow_fn, topological_rank_weights(), h)
 
-    ordering = topological_sort(g)
-    ranks = {v: i for i, v in enumerate(ordering)}
 
-    def weight_fn(e: Edge):
-        return abs(ranks[e.v] - ranks[e.u])
+def run_test_with_scc_weight(
+    input: Input,
+    expected: int,
+    flow_fn: FlowFn,
+    h: int | None = None,
+):
+    benchmark.register("bench_config.scc_weight", True)
 
-    return run_test(input, expected, flow_fn, weight_fn, h)
+    return run_test(input, expected, flow_fn, condensation_weights(), h)
 
 
 def run_test_with_flow_weight(
-    input: str,
+    input: Input,
     expected: int,
     flow_fn: FlowFn,
     h: int | None = None,
 ):
     benchmark.register("bench_config.weight_from_flow", True)
 
-    g, sources, sinks = parse_input(input, expected)
+    g, sources, sinks = read_input(input, expected)
 
     weight_fn = weight_function_from_flow(g, sources, sinks)
 